@@ -1,11 +1,30 @@
 import asyncio
+import importlib
 import logging
 
 import dependency_injector.containers as containers
 import dependency_injector.providers as providers
 
+from .lib.cache import ConeCache
+from .lib.components import ComponentValidator
 from .services import graph as graph_service
-from .services.graph.resource import mem, pg
+
+
+def lazy(module, name):
+    """Callable importing ``module`` and calling its ``name`` attribute
+    (``Class`` or ``Class.method``) on the first call only, so backends
+    and their drivers load only when configured."""
+    def factory(*args, **kwargs):
+        target = importlib.import_module(module, __package__)
+        for attr in name.split('.'):
+            target = getattr(target, attr)
+
+        return target(*args, **kwargs)
+
+    return factory
+
+
+RESOURCE = '.services.graph.resource.'
 
 
 class Core(containers.DeclarativeContainer):
@@ -21,7 +40,13 @@ class Core(containers.DeclarativeContainer):
 class Resources(containers.DeclarativeContainer):
 
     pg = providers.Singleton(
-        pg.PgEngine,
+        lazy(RESOURCE + 'pg', 'PgEngine'),
+        config=Core.config,
+        loop=Core.loop,
+    )
+
+    sqlite = providers.Singleton(
+        lazy(RESOURCE + 'sqlite', 'SqliteEngine'),
         config=Core.config,
         loop=Core.loop,
     )
@@ -30,12 +55,54 @@ class Resources(containers.DeclarativeContainer):
 class Models(containers.DeclarativeContainer):
 
     mem_graph = providers.Factory(
-        mem.InMemoryGraphModel
+        lazy(RESOURCE + 'mem', 'InMemoryGraphModel'),
+        trees_cache=providers.Factory(
+            ConeCache.from_config,
+            config=Core.config,
+            backend='mem',
+        ),
+        snapshot_path=Core.config.mem.snapshot,
+        validator=providers.Factory(
+            ComponentValidator.from_config,
+            config=Core.config,
+            backend='mem',
+        ),
     )
 
     pg_graph = providers.Factory(
-        pg.PgGinGraphModel,
+        lazy(RESOURCE + 'pg', 'PgGinGraphModel'),
         pg_engine=Resources.pg,
+        trees_cache=providers.Factory(
+            ConeCache.from_config,
+            config=Core.config,
+            backend='postgres',
+        ),
+    )
+
+    pg_closure_graph = providers.Factory(
+        lazy(RESOURCE + 'pg', 'PgClosureGraphModel'),
+        pg_engine=Resources.pg,
+        trees_cache=providers.Factory(
+            ConeCache.from_config,
+            config=Core.config,
+            backend='postgres',
+        ),
+    )
+
+    sqlite_graph = providers.Factory(
+        lazy(RESOURCE + 'sqlite', 'SqliteGraphModel'),
+        sqlite_engine=Resources.sqlite,
+        trees_cache=providers.Factory(
+            ConeCache.from_config,
+            config=Core.config,
+            backend='sqlite',
+        ),
+    )
+
+    # wraps one of the above, see ServiceRunner._init_resources
+    cached_graph = providers.Factory(
+        lazy(RESOURCE + 'cached', 'CachedGraphModel.from_config'),
+        config=Core.config,
     )
 
 
@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import itertools
+
+
+class Overloaded(Exception):
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Gate:
+    """Concurrency limit with a bounded, cheapest-first wait queue.
+
+    At most ``limit`` requests run at once, up to ``queue`` more wait for
+    a slot at most ``timeout`` seconds. Waiting requests are admitted in
+    the order of their estimated ``cost``; when the queue is full the most
+    expensive one is shed for a cheaper newcomer. A rejected request gets
+    :class:`Overloaded` right away.
+    """
+
+    def __init__(self, limit, queue=0, timeout=None, retry_after=1,
+                 status=503):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.status = status
+
+        self.active = 0
+        self._waiting = []
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.shed = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_config(cls, section) -> 'Gate':
+        return cls(
+            limit=section['limit'],
+            queue=section.get('queue', 0),
+            timeout=section.get('timeout'),
+            retry_after=section.get('retry_after', 1),
+            status=section.get('status', 503),
+        )
+
+    def __len__(self):
+        return len(self._waiting)
+
+    async def acquire(self, cost=1):
+        if self.active < self.limit and not self._waiting:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiting) >= self.queue:
+            worst = max(self._waiting, default=None)
+
+            if worst is None or worst[0] <= cost:
+                self.rejected += 1
+                raise Overloaded('queue is full')
+
+            self._remove(worst)
+            worst[2].set_exception(Overloaded('shed'))
+            self.shed += 1
+
+        entry = (cost, next(self._seq), asyncio.Future())
+        heapq.heappush(self._waiting, entry)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(entry[2]), self.timeout)
+        except asyncio.TimeoutError:
+            self._abandon(entry)
+            self.timeouts += 1
+            raise Overloaded('timed out')
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+
+        self.admitted += 1
+
+    def release(self):
+        self.active -= 1
+
+        while self._waiting and self.active < self.limit:
+            _, _, future = heapq.heappop(self._waiting)
+
+            self.active += 1
+            future.set_result(None)
+
+    def _remove(self, entry):
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+
+    def _abandon(self, entry):
+        future = entry[2]
+
+        if future.done() and not future.exception():
+            # the slot came in the meantime, pass it on
+            self.release()
+        elif not future.done():
+            future.cancel()
+            self._remove(entry)
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'waiting': len(self._waiting),
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'shed': self.shed,
+            'timeouts': self.timeouts,
+        }
+
+
+class Admission:
+    """Per-route :class:`Gate` s built from the ``admission`` config.
+
+    Routes listed under ``routes`` get their own settings, any other
+    route gets a gate of the ``default`` settings if there are some.
+    """
+
+    def __init__(self, routes=None, default=None):
+        self.routes = routes or {}
+        self.default = default
+
+        self._gates = {}
+
+    @classmethod
+    def from_config(cls, config) -> 'Admission':
+        section = config.get('admission') or {}
+
+        return cls(section.get('routes'), section.get('default'))
+
+    def gate(self, route) -> Gate:
+        gate = self._gates.get(route)
+
+        if gate is None:
+            section = self.routes.get(route, self.default)
+            if section is None:
+                return None
+
+            gate = self._gates[route] = Gate.from_config(section)
+
+        return gate
+
+    def stats(self) -> dict:
+        return {route: gate.stats() for route, gate in self._gates.items()}
@@ -0,0 +1,197 @@
+from collections import OrderedDict
+
+
+class ConeCache:
+    """LRU cache of per-vertex results keyed by the vertex cone.
+
+    Every entry remembers the set of vertexes its value was derived from
+    (the cone), so inserting an edge only drops entries whose cone
+    contains one of its ends.  The cache is bounded both by the number of
+    entries (``maxsize``) and by the total weight of the cached values
+    (``maxweight``, e.g. the number of cached paths); ``0`` disables the
+    corresponding bound, ``maxsize=0`` disables caching altogether.
+    """
+
+    def __init__(self, maxsize=1024, maxweight=0):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+
+        self._entries = OrderedDict()
+        self._index = {}
+        self._weight = 0
+
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, config, backend, name='trees_cache'):
+        section = (config.get(backend) or {}).get(name) or {}
+
+        return cls(
+            maxsize=section.get('maxsize', 1024),
+            maxweight=section.get('maxweight', 0),
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, vertex):
+        return vertex in self._entries
+
+    def get(self, vertex, default=None):
+        try:
+            value, _, _ = self._entries[vertex]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(vertex)
+        self.hits += 1
+
+        return value
+
+    def peek(self, vertex, default=None):
+        """Return the cached value without touching LRU order or stats."""
+        entry = self._entries.get(vertex)
+
+        return default if entry is None else entry[0]
+
+    def cone_size(self, vertex, default=None):
+        entry = self._entries.get(vertex)
+
+        return default if entry is None else len(entry[1])
+
+    def put(self, vertex, value, cone, weight=1, generation=None):
+        """Store ``value`` derived from the vertexes of ``cone``.
+
+        ``generation`` is the value of :attr:`generation` read before the
+        value was computed; if anything was invalidated in between the
+        value may be stale and is not stored.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        if not self.maxsize or (self.maxweight and weight > self.maxweight):
+            return
+
+        self._discard(vertex)
+
+        cone = frozenset(cone) | {vertex}
+        self._entries[vertex] = (value, cone, weight)
+        self._weight += weight
+
+        for v in cone:
+            self._index.setdefault(v, set()).add(vertex)
+
+        while len(self._entries) > self.maxsize or (
+            self.maxweight and self._weight > self.maxweight
+        ):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, *vertexes):
+        """Drop every entry whose cone contains one of ``vertexes``."""
+        self.generation += 1
+
+        for v in vertexes:
+            for key in list(self._index.get(v, ())):
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+
+        self._entries.clear()
+        self._index.clear()
+        self._weight = 0
+
+    def _discard(self, vertex):
+        entry = self._entries.pop(vertex, None)
+        if entry is None:
+            return
+
+        _, cone, weight = entry
+        self._weight -= weight
+
+        for v in cone:
+            keys = self._index.get(v)
+            if keys is not None:
+                keys.discard(vertex)
+                if not keys:
+                    del self._index[v]
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'weight': self._weight,
+            'maxsize': self.maxsize,
+            'maxweight': self.maxweight,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class LRUCache:
+    """Plain LRU mapping bounded by ``maxsize`` entries."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def peek(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        return self._entries.pop(key, default)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,189 @@
+import multiprocessing
+from itertools import chain
+
+from .graph import ABCGraph, AcyclicDiGraph
+
+
+class DisjointSet:
+    """Union-find with path halving and union by size."""
+
+    def __init__(self):
+        self._parent = {}
+        self._size = {}
+
+    def find(self, x):
+        parent = self._parent
+
+        if x not in parent:
+            parent[x] = x
+            self._size[x] = 1
+            return x
+
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+
+        return a
+
+    def groups(self) -> list:
+        groups = {}
+        for x in self._parent:
+            groups.setdefault(self.find(x), set()).add(x)
+
+        return list(groups.values())
+
+
+def weak_components(graph: ABCGraph) -> list:
+    """Vertex sets of the weakly connected components of the edges of
+    ``graph``; vertexes without edges are left out."""
+    components = DisjointSet()
+
+    for v_from, v_to in graph.iter_edges():
+        if v_to is not None:
+            components.union(v_from, v_to)
+
+    return components.groups()
+
+
+# read-only state of a validation, inherited by the forked workers
+_graph = None
+_batch = None
+_components = None
+_owners = None
+
+
+def _check_component(i):
+    """Look for a cycle through the edges of component ``i`` and tell
+    which other components its vertexes reach in the existing graph."""
+    members = _components[i]
+
+    def out_vs(v):
+        if v in members:
+            return chain(_graph.vertexes_to(v), _batch.vertexes_to(v))
+
+        return _graph.vertexes_to(v)
+
+    seen = set()
+    if AcyclicDiGraph.has_cycle(
+        out_vs,
+        [v for v in members if _batch.vertexes_to(v)],
+        seen,
+    ):
+        return True, ()
+
+    return False, {
+        _owners[v] for v in seen
+        if _owners.get(v, i) != i and _batch.vertexes_to(v)
+    }
+
+
+class ComponentValidator:
+    """Cycle check of a large batch of edges split by weak component.
+
+    The batch is split into its weakly connected components (the existing
+    vertexes the batch attaches to included), which are checked in a pool
+    of ``processes`` forked workers against a copy-on-write snapshot of
+    the graph. A cycle through the edges of several components has to
+    leave each of them through the existing graph into the next one, so
+    the workers also report which components they reach; only if those
+    form a cycle the batch is checked again as a whole.
+
+    Batches below ``min_edges`` edges, with a single component, or on
+    platforms without ``fork`` are checked serially.
+    """
+
+    def __init__(self, processes=None, min_edges=100000):
+        self.processes = processes
+        self.min_edges = min_edges
+
+        self.parallel = 0
+        self.serial = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_config(cls, config, backend, name='parallel_validation'):
+        options = (config.get(backend) or {}).get(name)
+
+        if not options:
+            return None
+
+        return cls(
+            processes=options.get('processes'),
+            min_edges=options.get('min_edges', 100000),
+        )
+
+    def has_cycle(self, graph: ABCGraph, batch: ABCGraph) -> bool:
+        edges = sum(len(batch.vertexes_to(v)) for v in batch.vertexes())
+
+        if edges >= self.min_edges:
+            components = weak_components(batch)
+
+            if len(components) > 1:
+                try:
+                    context = multiprocessing.get_context('fork')
+                except ValueError:
+                    pass
+                else:
+                    return self._parallel(context, graph, batch, components)
+
+        self.serial += 1
+
+        return self._serial(graph, batch)
+
+    def _parallel(self, context, graph, batch, components) -> bool:
+        global _graph, _batch, _components, _owners
+
+        self.parallel += 1
+
+        _graph, _batch, _components = graph, batch, components
+        _owners = {
+            v: i for i, component in enumerate(components) for v in component
+        }
+
+        try:
+            with context.Pool(self.processes) as pool:
+                results = pool.map(_check_component, range(len(components)))
+        finally:
+            _graph = _batch = _components = _owners = None
+
+        if any(cyclic for cyclic, _ in results):
+            return True
+
+        reaches = {i: reached for i, (_, reached) in enumerate(results)}
+        if AcyclicDiGraph.has_cycle(
+            lambda i: reaches[i],
+            [i for i in reaches if reaches[i]],
+            seen=set(),
+        ):
+            self.fallbacks += 1
+            return self._serial(graph, batch)
+
+        return False
+
+    @staticmethod
+    def _serial(graph, batch) -> bool:
+        return AcyclicDiGraph.has_cycle(
+            lambda v: chain(graph.vertexes_to(v), batch.vertexes_to(v)),
+            [v for v in batch.vertexes() if batch.vertexes_to(v)],
+            seen=set(),
+        )
+
+    def stats(self) -> dict:
+        return {
+            'parallel': self.parallel,
+            'serial': self.serial,
+            'fallbacks': self.fallbacks,
+        }
@@ -1,5 +1,6 @@
 import abc
 import copy
+from itertools import chain
 
 
 class GraphException(Exception):
@@ -29,6 +30,14 @@ class ABCGraph(metaclass=abc.ABCMeta):
     def insert(self, v_from, v_to):
         pass
 
+    @abc.abstractmethod
+    def remove(self, v_from, v_to) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def remove_vertex(self, vertex) -> bool:
+        pass
+
     @abc.abstractmethod
     def has_vertex(self, vertex) -> bool:
         pass
@@ -41,10 +50,18 @@ class ABCGraph(metaclass=abc.ABCMeta):
     def vertexes_to(self, vertex) -> set:
         pass
 
+    @abc.abstractmethod
+    def vertexes_from(self, vertex) -> set:
+        pass
+
     @abc.abstractmethod
     def vertexes(self) -> set:
         pass
 
+    @abc.abstractmethod
+    def iter_edges(self):
+        pass
+
     @abc.abstractmethod
     def union(self, other) -> 'ABCGraph':
         pass
@@ -63,28 +80,106 @@ class ABCGraph(metaclass=abc.ABCMeta):
 
 
 class DiGraph(ABCGraph):
+    """Directed graph keeping both out- and in-adjacency.
+
+    Every adjacency set is owned by one graph and updated in place, so
+    building a graph from ``E`` edges costs ``O(V + E)``.
+    """
 
     _sentinel = frozenset()
 
     def __init__(self, edges=None):
-        self.edges = edges or {}
+        self.edges = {}
+        self.inv_edges = {}
+        self._vtxs = set()
+
+        if edges:
+            for e_from, _edges in edges.items():
+                self.edges.setdefault(e_from, self._sentinel)
+                self._vtxs.add(e_from)
 
-        self._vtxs = set(self.edges.keys())
+                for e_to in _edges:
+                    self.insert(e_from, e_to)
+
+    @classmethod
+    def _view(cls, edges, inv_edges, vtxs) -> 'DiGraph':
+        graph = cls.__new__(cls)
+        graph.edges = edges
+        graph.inv_edges = inv_edges
+        graph._vtxs = vtxs
 
-        if len(self.edges):
-            for _edges in self.edges.values():
-                self._vtxs = self._vtxs | _edges
+        return graph
+
+    @classmethod
+    def from_edges(cls, edges) -> 'DiGraph':
+        """Build a graph from ``(v_from, v_to)`` pairs in ``O(V + E)``.
+
+        ``v_to`` may be ``None`` to add a bare vertex.
+        """
+        graph = cls()
+
+        insert = graph.insert
+        for e_from, e_to in edges:
+            insert(e_from, e_to)
+
+        return graph
 
     def insert(self, e_from, e_to):
+        self._vtxs.add(e_from)
+
         if e_to is None:
-            self.edges[e_from] = self._sentinel
-            self._vtxs.add(e_from)
-        else:
-            self.edges[e_from] = set(self.edges.get(e_from, set()))
-            self.edges[e_from].add(e_to)
+            self.edges.setdefault(e_from, self._sentinel)
+            return
+
+        self._vtxs.add(e_to)
+
+        vs_to = self.edges.get(e_from, self._sentinel)
+        if vs_to is self._sentinel:
+            vs_to = self.edges[e_from] = set()
+        vs_to.add(e_to)
+
+        vs_from = self.inv_edges.get(e_to, self._sentinel)
+        if vs_from is self._sentinel:
+            vs_from = self.inv_edges[e_to] = set()
+        vs_from.add(e_from)
+
+    def remove(self, e_from, e_to) -> bool:
+        """Remove the edge in ``O(1)``, its ends stay in the graph.
+
+        Return whether there was such an edge.
+        """
+        if not self.has_edge(e_from, e_to):
+            return False
+
+        self._unlink(self.edges, e_from, e_to)
+        self._unlink(self.inv_edges, e_to, e_from)
 
-            self._vtxs.add(e_from)
-            self._vtxs.add(e_to)
+        return True
+
+    def remove_vertex(self, vertex) -> bool:
+        """Remove the vertex with all its edges in ``O(degree)``.
+
+        Return whether there was such a vertex.
+        """
+        if vertex not in self._vtxs:
+            return False
+
+        for v_to in self.edges.pop(vertex, self._sentinel):
+            self._unlink(self.inv_edges, v_to, vertex)
+        for v_from in self.inv_edges.pop(vertex, self._sentinel):
+            self._unlink(self.edges, v_from, vertex)
+
+        self._vtxs.discard(vertex)
+
+        return True
+
+    def _unlink(self, adjacency, vertex, other):
+        vs = adjacency.get(vertex)
+
+        if vs:
+            vs.discard(other)
+            if not vs:
+                adjacency[vertex] = self._sentinel
 
     def has_vertex(self, vertex) -> bool:
         return vertex in self._vtxs
@@ -95,43 +190,69 @@ class DiGraph(ABCGraph):
     def vertexes_to(self, vertex) -> set:
         return self.edges.get(vertex, self._sentinel)
 
+    def vertexes_from(self, vertex) -> set:
+        return self.inv_edges.get(vertex, self._sentinel)
+
     def vertexes(self) -> set:
         return self._vtxs
 
-    def union(self, other: 'ABCGraph') -> 'DiGraph':
-        for edge in other.vertexes():
-            self._vtxs.add(edge)
-            self._vtxs = self._vtxs | other.vertexes_to(edge)
+    def iter_edges(self):
+        """Yield ``(v_from, v_to)`` pairs, ``(vertex, None)`` for vertexes
+        without any edge, so ``from_edges(g.iter_edges())`` copies ``g``.
+        """
+        for vertex in self._vtxs:
+            vs_to = self.edges.get(vertex, self._sentinel)
+
+            if vs_to:
+                for v_to in vs_to:
+                    yield vertex, v_to
+            elif not self.inv_edges.get(vertex):
+                yield vertex, None
+
+    def union_update(self, other: 'ABCGraph') -> 'DiGraph':
+        insert = self.insert
 
-            if edge in self.edges:
-                self.edges[edge] = self.edges[edge] | (other.vertexes_to(edge))
+        for vertex in other.vertexes():
+            vs_to = other.vertexes_to(vertex)
+
+            if vs_to:
+                for v_to in vs_to:
+                    insert(vertex, v_to)
             else:
-                self.edges[edge] = other.vertexes_to(edge).copy()
+                insert(vertex, None)
 
         return self
 
+    def union(self, other: 'ABCGraph') -> 'DiGraph':
+        return self.union_update(other)
+
     def __len__(self):
-        return len(self.edges)
+        # every vertex, sinks included (used to be the number of vertexes
+        # with an ``edges`` entry)
+        return len(self._vtxs)
 
     def __copy__(self):
-        return DiGraph(self.edges.copy())
+        return self._view(
+            {v: set(vs) if vs else vs for v, vs in self.edges.items()},
+            {v: set(vs) if vs else vs for v, vs in self.inv_edges.items()},
+            self._vtxs.copy(),
+        )
 
     def reverse(self) -> 'DiGraph':
-        tmp = DiGraph()
+        """O(1) view with the edge directions swapped.
 
-        for v_from in self.vertexes():
-            for v_to in self.vertexes_to(v_from):
-                tmp.insert(v_to, v_from)
-
-        return tmp
+        The view shares storage with this graph, writes to either one are
+        visible in both.
+        """
+        return self._view(self.inv_edges, self.edges, self._vtxs)
 
 
 class AcyclicDiGraph(ABCGraph):
 
-    def __init__(self, di_graph=None):
-        self.di_graph = di_graph or DiGraph()
+    def __init__(self, di_graph=None, strict=True):
+        self.di_graph = di_graph if di_graph is not None else DiGraph()
 
-        if di_graph:
+        if strict and di_graph:
             if self.has_cycle(
                 self.vertexes_to,
                 filter(
@@ -142,11 +263,15 @@ class AcyclicDiGraph(ABCGraph):
             ):
                 raise InconsistentState()
 
+    @classmethod
+    def from_edges(cls, edges, strict=True) -> 'AcyclicDiGraph':
+        return cls(DiGraph.from_edges(edges), strict=strict)
+
     def __len__(self):
         return len(self.di_graph)
 
     def __copy__(self):
-        return AcyclicDiGraph(copy.copy(self.di_graph))
+        return AcyclicDiGraph(copy.copy(self.di_graph), strict=False)
 
     def has_vertex(self, vertex) -> bool:
         return self.di_graph.has_vertex(vertex)
@@ -157,16 +282,22 @@ class AcyclicDiGraph(ABCGraph):
     def has_edge(self, v_from, v_to) -> bool:
         return self.di_graph.has_edge(v_from, v_to)
 
-    def vertexes_to(self, vertex)-> set:
+    def vertexes_to(self, vertex) -> set:
         return self.di_graph.vertexes_to(vertex)
 
+    def vertexes_from(self, vertex) -> set:
+        return self.di_graph.vertexes_from(vertex)
+
+    def iter_edges(self):
+        return self.di_graph.iter_edges()
+
     def insert(self, v_from, v_to, strict=True):
         if self.has_edge(v_from, v_to):
             return
 
-        vtx_to = self.vertexes_to(v_from) | {v_to}
-        if strict and self.has_cycle(
-            lambda e: vtx_to if e == v_from else self.vertexes_to(e),
+        if strict and v_to is not None and self.has_cycle(
+            lambda e: chain(self.vertexes_to(e), (v_to,))
+            if e == v_from else self.vertexes_to(e),
             {v_from},
             seen=set()
         ):
@@ -176,9 +307,26 @@ class AcyclicDiGraph(ABCGraph):
 
         self.di_graph.insert(v_from, v_to)
 
-    def union(self, other: ABCGraph, strict=True) -> 'AcyclicDiGraph':
-        if strict and self.has_cycle(
-            lambda e: self.vertexes_to(e) | other.vertexes_to(e),
+    def remove(self, v_from, v_to) -> bool:
+        # removing never makes a cycle
+        return self.di_graph.remove(v_from, v_to)
+
+    def remove_vertex(self, vertex) -> bool:
+        return self.di_graph.remove_vertex(vertex)
+
+    def union_update(
+        self,
+        other: ABCGraph,
+        strict=True,
+        validator=None,
+    ) -> 'AcyclicDiGraph':
+        if not strict:
+            pass
+        elif validator is not None:
+            if validator.has_cycle(self.di_graph, other):
+                raise InconsistentState()
+        elif self.has_cycle(
+            lambda e: chain(self.vertexes_to(e), other.vertexes_to(e)),
             set(filter(
                 lambda other_edge: len(other.vertexes_to(other_edge)) > 0,
                 other.vertexes(),
@@ -187,49 +335,80 @@ class AcyclicDiGraph(ABCGraph):
         ):
             raise InconsistentState()
 
-        self.di_graph.union(other)
+        self.di_graph.union_update(other)
 
         return self
 
+    def union(
+        self,
+        other: ABCGraph,
+        strict=True,
+        validator=None,
+    ) -> 'AcyclicDiGraph':
+        return self.union_update(other, strict=strict, validator=validator)
+
     @classmethod
     def has_cycle(cls, out_vs, from_vs, seen):
-        if not from_vs:
-            return False
+        """Iterative DFS from ``from_vs`` over ``out_vs`` in ``O(V + E)``.
+
+        ``seen`` collects the vertexes proven not to lead to a cycle and
+        may be shared between calls over the same graph.
+        """
+        path = set()
 
         for from_edge in from_vs:
-            seen.add(from_edge)
+            if from_edge in seen:
+                continue
+
+            path.add(from_edge)
+            stack = [(from_edge, iter(out_vs(from_edge)))]
+
+            while stack:
+                edge, out_edges = stack[-1]
 
-            for out_edge in out_vs(from_edge):
-                if out_edge in seen:
-                    return True
+                for out_edge in out_edges:
+                    if out_edge in path:
+                        return True
 
-                seen.add(out_edge)
-                if cls.has_cycle(out_vs, out_vs(out_edge), seen):
-                    return True
-                seen.remove(out_edge)
-            seen.remove(from_edge)
+                    if out_edge not in seen:
+                        path.add(out_edge)
+                        stack.append((out_edge, iter(out_vs(out_edge))))
+                        break
+                else:
+                    stack.pop()
+                    path.remove(edge)
+                    seen.add(edge)
 
         return False
 
     @classmethod
     async def ahas_cycle(cls, out_vs, from_vs, seen):
-        if not from_vs:
-            return False
+        path = set()
 
         for from_edge in from_vs:
-            seen.add(from_edge)
+            if from_edge in seen:
+                continue
+
+            path.add(from_edge)
+            stack = [(from_edge, iter(await out_vs(from_edge)))]
+
+            while stack:
+                edge, out_edges = stack[-1]
 
-            for out_edge in await out_vs(from_edge):
-                if out_edge in seen:
-                    return True
+                for out_edge in out_edges:
+                    if out_edge in path:
+                        return True
 
-                seen.add(out_edge)
-                if await cls.ahas_cycle(out_vs, await out_vs(out_edge), seen):
-                    return True
-                seen.remove(out_edge)
-            seen.remove(from_edge)
+                    if out_edge not in seen:
+                        path.add(out_edge)
+                        stack.append((out_edge, iter(await out_vs(out_edge))))
+                        break
+                else:
+                    stack.pop()
+                    path.remove(edge)
+                    seen.add(edge)
 
         return False
 
     def reverse(self) -> 'AcyclicDiGraph':
-        return AcyclicDiGraph(self.di_graph.reverse())
+        return AcyclicDiGraph(self.di_graph.reverse(), strict=False)
@@ -0,0 +1,140 @@
+"""Approximate memory accounting of graphs, caches and indexes."""
+import sys
+import tracemalloc
+import types
+from collections import Counter
+
+from .graph import DiGraph
+
+_atomic = (str, bytes, int, float, bool)
+_shared = (type, types.ModuleType, types.FunctionType, types.MethodType)
+
+
+def sizeof(obj, exclude=()) -> int:
+    """Deep ``sys.getsizeof`` of ``obj`` in bytes: containers with their
+    items, objects with their attributes, numpy arrays with their buffers.
+
+    Every object is counted once; objects whose ``id`` is in ``exclude``
+    (e.g. vertexes or a graph accounted for elsewhere), ``None``, classes,
+    modules and functions are not counted at all.
+    """
+    seen = set(exclude)
+    stack = [obj]
+    total = 0
+
+    while stack:
+        obj = stack.pop()
+
+        if obj is None or id(obj) in seen or isinstance(obj, _shared):
+            continue
+        seen.add(id(obj))
+
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, _atomic):
+            continue
+
+        if hasattr(obj, 'nbytes'):
+            if getattr(obj, 'base', None) is not None:
+                # a view, getsizeof() leaves the buffer out
+                total += obj.nbytes
+            continue
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+
+        if hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                stack.append(getattr(obj, slot))
+
+    return total
+
+
+def degree_histogram(degrees) -> dict:
+    """Count of degrees in power of two buckets: ``0``, ``1``, ``2-3``,
+    ``4-7``..."""
+    buckets = Counter(degree.bit_length() for degree in degrees)
+
+    def name(bucket):
+        if bucket < 2:
+            return str(bucket)
+
+        return '{}-{}'.format(1 << (bucket - 1), (1 << bucket) - 1)
+
+    return {name(bucket): buckets[bucket] for bucket in sorted(buckets)}
+
+
+def graph_memory(graph: DiGraph) -> dict:
+    """Bytes of the adjacency structures of ``graph``, the vertex objects
+    they share counted apart, with vertex/edge counts and degrees."""
+    vertexes = {id(v) for v in graph._vtxs}
+    edges = sum(len(vs) for vs in graph.edges.values())
+
+    return {
+        'vertexes': len(graph._vtxs),
+        'edges': edges,
+        'bytes': {
+            'vertex_objects': sum(map(sys.getsizeof, graph._vtxs)),
+            'edges': sizeof(graph.edges, vertexes),
+            'inv_edges': sizeof(graph.inv_edges, vertexes),
+            '_vtxs': sizeof(graph._vtxs, vertexes),
+        },
+        'out_degree': degree_histogram(
+            len(graph.edges.get(v, ())) for v in graph._vtxs
+        ),
+        'in_degree': degree_histogram(
+            len(graph.inv_edges.get(v, ())) for v in graph._vtxs
+        ),
+    }
+
+
+class HeapTracer:
+    """``tracemalloc`` snapshots diffed against the previous one.
+
+    The first :meth:`diff` starts tracing and returns nothing to compare
+    with; tracing costs memory and time until :meth:`stop`.
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._snapshot = None
+
+    def diff(self, limit=20) -> list:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        previous, self._snapshot = self._snapshot, snapshot
+
+        if previous is None:
+            return []
+
+        return [
+            {
+                'where': str(stat.traceback),
+                'size': stat.size,
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff,
+            }
+            for stat in snapshot.compare_to(previous, 'lineno')[:limit]
+        ]
+
+    def stop(self):
+        self._snapshot = None
+        tracemalloc.stop()
+
+    def stats(self) -> dict:
+        traced, peak = tracemalloc.get_traced_memory()
+
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'traced_bytes': traced,
+            'peak_bytes': peak,
+        }
@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+
+
+class Timings:
+    """Count, total and maximum duration of named operations."""
+
+    def __init__(self):
+        self._timings = {}
+
+    @contextmanager
+    def time(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        timing = self._timings.get(name)
+
+        if timing is None:
+            self._timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'avg_ms': round(total / count * 1000, 3),
+                'max_ms': round(longest * 1000, 3),
+            }
+            for name, (count, total, longest) in self._timings.items()
+        }
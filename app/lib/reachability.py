@@ -0,0 +1,141 @@
+import numpy as np
+
+from .graph import ABCGraph
+from .topo import TopologicalLayers
+
+
+class ReachabilityIndex:
+    """Batch "does ``a`` reach ``b``" over a frozen DAG snapshot.
+
+    Vertexes are interned in topological (layer) order, so every ancestor
+    of a vertex gets a smaller id. The transitive closure is computed as
+    bitsets, one block of target vertexes at a time: rows are filled from
+    the deepest layer up by OR-ing the rows of the children word by word.
+    A block only needs the rows of vertexes before its last target, and
+    its size is chosen to keep the matrix under ``max_bytes``.
+
+    Every vertex reaches itself.
+    """
+
+    def __init__(self, vertexes, layer_bounds, sources, targets,
+                 max_bytes=64 << 20):
+        self.vertexes = vertexes
+        self.ids = {vertex: i for i, vertex in enumerate(vertexes)}
+
+        # vertexes of layer ``l`` are ids ``layer_bounds[l]:[l + 1]``
+        self.layer_bounds = layer_bounds
+        self.layer_of = np.repeat(
+            np.arange(len(layer_bounds) - 1),
+            np.diff(layer_bounds),
+        )
+
+        order = np.argsort(sources, kind='mergesort')
+        self.sources = sources[order]
+        self.targets = targets[order]
+        # edges leaving layer ``l`` are ``edge_bounds[l]:[l + 1]``
+        self.edge_bounds = np.searchsorted(self.sources, layer_bounds)
+
+        words = max(1, max_bytes // (8 * max(1, len(vertexes))))
+        self.block_size = words * 64
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: ABCGraph,
+        layers: TopologicalLayers = None,
+        **kwargs
+    ) -> 'ReachabilityIndex':
+        layers = layers or TopologicalLayers(graph)
+
+        vertexes, layer_bounds = [], [0]
+        for layer in layers.layers:
+            vertexes.extend(layer)
+            layer_bounds.append(len(vertexes))
+
+        ids = {vertex: i for i, vertex in enumerate(vertexes)}
+
+        sources, targets = [], []
+        for v_from, v_to in graph.iter_edges():
+            if v_to is not None:
+                sources.append(ids[v_from])
+                targets.append(ids[v_to])
+
+        return cls(
+            vertexes,
+            np.array(layer_bounds, dtype=np.int64),
+            np.array(sources, dtype=np.int64),
+            np.array(targets, dtype=np.int64),
+            **kwargs
+        )
+
+    def __len__(self):
+        return len(self.vertexes)
+
+    def _closure(self, start, stop) -> np.ndarray:
+        """Bitsets of targets ``start:stop`` for vertexes ``0:stop``."""
+        closure = np.zeros(
+            (stop, (stop - start + 63) // 64),
+            dtype=np.uint64,
+        )
+
+        offsets = np.arange(stop - start)
+        closure[offsets + start, offsets >> 6] = np.left_shift(
+            np.uint64(1), (offsets & 63).astype(np.uint64),
+        )
+
+        # vertexes in or below the last layer of the block reach nothing
+        # in it but themselves
+        for layer in range(self.layer_of[stop - 1] - 1, -1, -1):
+            lo, hi = self.edge_bounds[layer], self.edge_bounds[layer + 1]
+            if lo == hi:
+                continue
+
+            sources, targets = self.sources[lo:hi], self.targets[lo:hi]
+            inside = targets < stop
+
+            np.bitwise_or.at(
+                closure,
+                sources[inside],
+                closure[targets[inside]],
+            )
+
+        return closure
+
+    def reaches(self, pairs) -> np.ndarray:
+        pairs = list(pairs)
+
+        a = np.fromiter(
+            (self.ids.get(v_from, -1) for v_from, _ in pairs),
+            dtype=np.int64,
+            count=len(pairs),
+        )
+        b = np.fromiter(
+            (self.ids.get(v_to, -1) for _, v_to in pairs),
+            dtype=np.int64,
+            count=len(pairs),
+        )
+
+        result = (a == b) & (a >= 0)
+
+        # an ancestor always sits in a strictly lower layer
+        candidates = (a >= 0) & (b >= 0) & ~result
+        candidates[candidates] = (
+            self.layer_of[a[candidates]] < self.layer_of[b[candidates]]
+        )
+
+        blocks = b // self.block_size
+        for block in np.unique(blocks[candidates]):
+            start = int(block) * self.block_size
+            stop = min(start + self.block_size, len(self.vertexes))
+
+            closure = self._closure(start, stop)
+
+            mask = candidates & (blocks == block)
+            offsets = b[mask] - start
+            bits = np.right_shift(
+                closure[a[mask], offsets >> 6],
+                (offsets & 63).astype(np.uint64),
+            )
+            result[mask] = (bits & np.uint64(1)).astype(bool)
+
+        return result
@@ -0,0 +1,21 @@
+"""Graph snapshots as NDJSON, one ``[v_from, v_to]`` edge per line.
+
+Vertexes without edges are written as ``[vertex, null]``, so
+``DiGraph.from_edges(load(f))`` restores the graph that was dumped.
+"""
+import json
+
+from .graph import ABCGraph
+
+
+def dump(graph: ABCGraph, f):
+    for edge in graph.iter_edges():
+        f.write(json.dumps(edge))
+        f.write('\n')
+
+
+def load(f):
+    for line in f:
+        if line.strip():
+            v_from, v_to = json.loads(line)
+            yield v_from, v_to
@@ -0,0 +1,129 @@
+"""Induced sub-DAGs around a vertex and their compact encodings.
+
+``ndjson`` writes one ``[v_from, v_to]`` edge per line like
+:mod:`.snapshot` (``[vertex, null]`` for vertexes without edges).
+
+``csr`` is a little-endian binary layout::
+
+    header   b'DAGC', version (u8), 3 pad bytes,
+             vertex count V (u32), edge count E (u32)
+    vertexes V times: byte length (u32), UTF-8 bytes
+    offsets  V + 1 u32, out-edges of vertex i are targets[offsets[i]:
+             offsets[i + 1]]
+    targets  E u32 vertex ids
+
+Vertexes are numbered in topological order, every edge goes from a
+smaller to a bigger id.
+"""
+import json
+import struct
+
+import numpy as np
+
+from .graph import ABCGraph, DiGraph
+from .topo import TopologicalLayers
+
+MAGIC = b'DAGC'
+VERSION = 1
+
+_header = struct.Struct('<4sB3xII')
+_length = struct.Struct('<I')
+
+
+def within(adjacent_f, vertex, hops=None) -> set:
+    """Vertexes at most ``hops`` steps (``None`` - any) from ``vertex``
+    over ``adjacent_f``, ``vertex`` itself included."""
+    seen, frontier = {vertex}, [vertex]
+
+    while frontier and (hops is None or hops > 0):
+        next_frontier = []
+
+        for v_from in frontier:
+            for v in adjacent_f(v_from):
+                if v not in seen:
+                    seen.add(v)
+                    next_frontier.append(v)
+
+        frontier = next_frontier
+        if hops is not None:
+            hops -= 1
+
+    return seen
+
+
+def induced(adjacent_f, vertexes) -> DiGraph:
+    """Subgraph on ``vertexes`` with every ``adjacent_f`` edge between
+    them."""
+    subgraph = DiGraph()
+
+    for vertex in vertexes:
+        subgraph.insert(vertex, None)
+
+        for v_to in adjacent_f(vertex):
+            if v_to in vertexes:
+                subgraph.insert(vertex, v_to)
+
+    return subgraph
+
+
+def ndjson(graph: ABCGraph, batch=1000):
+    """Yield the edges of ``graph`` as NDJSON, ``batch`` lines a chunk."""
+    lines = []
+
+    for edge in graph.iter_edges():
+        lines.append(json.dumps(edge))
+
+        if len(lines) >= batch:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def csr(graph: ABCGraph, batch=1000):
+    """Yield ``graph`` in the ``csr`` layout, in chunks."""
+    vertexes = list(TopologicalLayers(graph))
+    ids = {vertex: i for i, vertex in enumerate(vertexes)}
+
+    offsets, targets = [0], []
+    for vertex in vertexes:
+        targets.extend(sorted(ids[v] for v in graph.vertexes_to(vertex)))
+        offsets.append(len(targets))
+
+    yield _header.pack(MAGIC, VERSION, len(vertexes), len(targets))
+
+    for i in range(0, len(vertexes), batch):
+        chunk = []
+        for vertex in vertexes[i:i + batch]:
+            name = str(vertex).encode()
+            chunk.append(_length.pack(len(name)))
+            chunk.append(name)
+
+        yield b''.join(chunk)
+
+    yield np.asarray(offsets, dtype='<u4').tobytes()
+    yield np.asarray(targets, dtype='<u4').tobytes()
+
+
+def load_csr(data: bytes):
+    """Decode the ``csr`` layout into ``(vertexes, offsets, targets)``."""
+    magic, version, n_vertexes, n_edges = _header.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a csr subgraph')
+
+    position = _header.size
+    vertexes = []
+    for _ in range(n_vertexes):
+        length, = _length.unpack_from(data, position)
+        position += _length.size
+
+        vertexes.append(data[position:position + length].decode())
+        position += length
+
+    offsets = np.frombuffer(data, '<u4', n_vertexes + 1, position)
+    position += offsets.nbytes
+
+    targets = np.frombuffer(data, '<u4', n_edges, position)
+
+    return vertexes, offsets, targets
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+from collections import deque
+
+from .graph import ABCGraph
+
+
+class TopologicalLayers:
+    """Longest-path layering of a DAG kept up to date on changes.
+
+    ``depth(v)`` is ``0`` for vertexes without parents and
+    ``max(depth(parent)) + 1`` otherwise. Every edge goes from a lower
+    to a higher layer, so walking the layers in order is a topological
+    order of the graph.
+    """
+
+    def __init__(self, graph: ABCGraph):
+        self.graph = graph
+        self.depths = {}
+        self.layers = []
+
+        self.rebuild()
+
+    def rebuild(self):
+        self.depths = {}
+        self.layers = []
+
+        in_degree = {
+            vertex: len(self.graph.vertexes_from(vertex))
+            for vertex in self.graph.vertexes()
+        }
+        queue = deque(v for v, degree in in_degree.items() if degree == 0)
+
+        for vertex in queue:
+            self._move(vertex, 0)
+
+        while queue:
+            vertex = queue.popleft()
+            depth = self.depths[vertex] + 1
+
+            for v_to in self.graph.vertexes_to(vertex):
+                if self.depths.get(v_to, -1) < depth:
+                    self._move(v_to, depth)
+
+                in_degree[v_to] -= 1
+                if in_degree[v_to] == 0:
+                    queue.append(v_to)
+
+    def __len__(self):
+        return len(self.depths)
+
+    def __iter__(self):
+        for layer in self.layers:
+            yield from layer
+
+    def depth(self, vertex):
+        return self.depths.get(vertex)
+
+    def order(self, vertexes):
+        """Sort ``vertexes`` of the graph topologically."""
+        return sorted(vertexes, key=self.depths.__getitem__)
+
+    def insert(self, v_from, v_to):
+        """Account for an edge (or a bare vertex) already in the graph."""
+        self.update([v_from] if v_to is None else [v_from, v_to], [v_from])
+
+    def update(self, vertexes, sources):
+        """Account for a batch already merged into the graph.
+
+        ``vertexes`` are all the vertexes of the batch, ``sources`` the
+        ones with new outgoing edges.
+        """
+        for vertex in vertexes:
+            if vertex not in self.depths:
+                self._move(vertex, 0)
+
+        stack = list(sources)
+        while stack:
+            vertex = stack.pop()
+            depth = self.depths[vertex] + 1
+
+            for v_to in self.graph.vertexes_to(vertex):
+                if self.depths[v_to] < depth:
+                    self._move(v_to, depth)
+                    stack.append(v_to)
+
+    def remove(self, vertexes, targets):
+        """Account for a batch already removed from the graph.
+
+        ``vertexes`` are the removed vertexes, ``targets`` the ones that
+        lost incoming edges. Depths only go down: the vertexes below the
+        targets are settled in the order of their old depth, so all the
+        parents of a vertex are settled before it, and the walk stops at
+        vertexes whose depth does not change.
+        """
+        for vertex in vertexes:
+            depth = self.depths.pop(vertex, None)
+            if depth is not None:
+                self.layers[depth].discard(vertex)
+
+        seq = itertools.count()
+        heap = [
+            (self.depths[v], next(seq), v) for v in targets if v in self.depths
+        ]
+        heapq.heapify(heap)
+
+        while heap:
+            old_depth, _, vertex = heapq.heappop(heap)
+            if self.depths[vertex] != old_depth:
+                # settled already
+                continue
+
+            depth = max(
+                (self.depths[v] + 1 for v in self.graph.vertexes_from(vertex)),
+                default=0,
+            )
+            if depth == old_depth:
+                continue
+
+            self._move(vertex, depth)
+            for v_to in self.graph.vertexes_to(vertex):
+                heapq.heappush(heap, (self.depths[v_to], next(seq), v_to))
+
+        while self.layers and not self.layers[-1]:
+            self.layers.pop()
+
+    def _move(self, vertex, depth):
+        old_depth = self.depths.get(vertex)
+        if old_depth is not None:
+            self.layers[old_depth].discard(vertex)
+
+        while len(self.layers) <= depth:
+            self.layers.append(set())
+
+        self.layers[depth].add(vertex)
+        self.depths[vertex] = depth
@@ -0,0 +1,130 @@
+class _Direction:
+    """Memoized walk over one direction of a graph.
+
+    ``adjacent_f`` is a coroutine function returning the one-hop
+    neighbours of a vertex; every result derived from it (paths, cones,
+    path counts) is kept for the lifetime of the object.
+    """
+
+    def __init__(self, adjacent_f):
+        self._adjacent_f = adjacent_f
+        self._adjacent = {}
+        self._paths = {}
+        self._cones = {}
+        self._counts = {}
+
+    async def adjacent(self, vertex):
+        if vertex not in self._adjacent:
+            self._adjacent[vertex] = await self._adjacent_f(vertex)
+
+        return self._adjacent[vertex]
+
+    async def paths(self, vertex) -> list:
+        if vertex not in self._paths:
+            vs_out = await self.adjacent(vertex)
+
+            if len(vs_out) == 0:
+                paths = [(vertex,)]
+            else:
+                paths = []
+                for v_out in vs_out:
+                    paths.extend(
+                        (vertex,) + path for path in await self.paths(v_out)
+                    )
+
+            self._paths[vertex] = paths
+
+        return self._paths[vertex]
+
+    async def count(self, vertex) -> int:
+        if vertex not in self._counts:
+            vs_out = await self.adjacent(vertex)
+
+            if len(vs_out) == 0:
+                count = 1
+            else:
+                count = 0
+                for v_out in vs_out:
+                    count += await self.count(v_out)
+
+            self._counts[vertex] = count
+
+        return self._counts[vertex]
+
+    async def cone(self, vertex) -> frozenset:
+        if vertex not in self._cones:
+            cone, stack = set(), [vertex]
+
+            while stack:
+                for v_out in await self.adjacent(stack.pop()):
+                    if v_out in cone:
+                        continue
+
+                    cone.add(v_out)
+                    if v_out in self._cones:
+                        cone |= self._cones[v_out]
+                    else:
+                        stack.append(v_out)
+
+            self._cones[vertex] = frozenset(cone)
+
+        return self._cones[vertex]
+
+
+class MemoizedTraversal:
+    """Answers path queries for many vertexes sharing one memo.
+
+    Overlapping ancestor/descendant cones of the queried vertexes are
+    walked (and, for remote backends, fetched) only once.
+    """
+
+    operations = ('trees', 'ancestors', 'descendants', 'count')
+
+    directions = ('up', 'down', 'both')
+
+    def __init__(self, descendants_f, ancestors_f):
+        self._down = _Direction(descendants_f)
+        self._up = _Direction(ancestors_f)
+
+    async def trees(self, vertex) -> list:
+        child_subtrees = await self._down.paths(vertex)
+        parent_subtrees = await self._up.paths(vertex)
+
+        result = []
+        for parent_subtree in parent_subtrees:
+            parent_subtree = parent_subtree[:0:-1]
+
+            for child_subtree in child_subtrees:
+                result.append(list(parent_subtree + child_subtree))
+
+        return result
+
+    async def count(self, vertex) -> int:
+        return await self._up.count(vertex) * await self._down.count(vertex)
+
+    async def ancestors(self, vertex) -> frozenset:
+        return await self._up.cone(vertex)
+
+    async def descendants(self, vertex) -> frozenset:
+        return await self._down.cone(vertex)
+
+    async def cone(self, vertex, direction='both') -> set:
+        cone = {vertex}
+
+        if direction != 'up':
+            cone |= await self._down.cone(vertex)
+        if direction != 'down':
+            cone |= await self._up.cone(vertex)
+
+        return cone
+
+    async def run(self, operation, vertex):
+        if operation not in self.operations:
+            raise ValueError('Unknown operation {}'.format(operation))
+
+        result = await getattr(self, operation)(vertex)
+
+        if isinstance(result, frozenset):
+            return list(result)
+
+        return result
@@ -1,5 +1,12 @@
+import json
+import time
+
 from aiohttp import web
 
+from . import middlewares
+from ...lib import snapshot
+from ...lib.admission import Admission
+from .backends import BACKENDS
 from .handlers import NodesHandler
 
 
@@ -12,47 +19,222 @@ class ServiceRunner:
         self.log = log
         self.config = config
 
+        self.ready = False
+        self._warm_task = None
+
+    def _resource(self):
+        if self._backend.resource is not None:
+            return getattr(self.resources, self._backend.resource)()
+
     async def _init_resources(self):
-        if self.config['db'] == 'mem':
-            self._model = self.models.mem_graph()
-        elif self.config['db'] == 'pg':
-            # initi pg
-            pg = self.resources.pg()
-            await pg.init_engine()
+        try:
+            self._backend = BACKENDS[self.config['db']]
+        except KeyError:
+            raise SystemExit('Unknown db {}'.format(self.config['db']))
+
+        # only the configured backend (and its driver) gets imported
+        resource = self._resource()
+        if resource is not None:
+            await resource.init_engine()
+
+        self._model = getattr(
+            self.models,
+            self._backend.model_name(self.config),
+        )()
+
+        if self._backend.options(self.config).get('adjacency_cache'):
+            self._model = self.models.cached_graph(
+                backend=self._model,
+                section=self._backend.section,
+            )
+
+    async def _on_start(self):
+        self.app.on_startup.append(self._start_warm)
 
-            self._model = self.models.pg_graph()
+    async def _start_warm(self, app):
+        # not awaited: the socket gets bound while the model warms up
+        self._warm_task = self.loop.create_task(self._warm())
+
+    async def _warm(self):
+        started = time.monotonic()
+
+        try:
+            await self._model.warm()
+        except Exception as e:
+            self.log.exception(e)
+            return
+
+        self.ready = True
+        self.log.info('ready in {:.3f}s'.format(time.monotonic() - started))
 
     async def _on_close(self):
-        pass
+        self.app.on_cleanup.append(self._cleanup)
+
+    async def _cleanup(self, app):
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+
+        resource = self._resource()
+        if resource is not None:
+            await resource.close()
+
+    async def get_ready(self, request):
+        return web.json_response(
+            data={'ready': self.ready},
+            status=200 if self.ready else 503,
+        )
 
     async def _routes(self):
-        handler = NodesHandler(
+        self.admission = Admission.from_config(self.config)
+
+        handler = self._handler = NodesHandler(
             self._model,
-            log=self.log
+            log=self.log,
+            admission=self.admission,
         )
 
         self.app.router.add_post(
             '/nodes',
             handler.post_nodes,
+            name='post_nodes',
         )
         self.app.router.add_get(
             '/nodes',
             handler.get_vertexes,
+            name='get_vertexes',
+        )
+        self.app.router.add_delete(
+            '/nodes/{node_id}',
+            handler.delete_node,
+            name='delete_node',
+        )
+        self.app.router.add_delete(
+            '/edges',
+            handler.delete_edges,
+            name='delete_edges',
         )
         self.app.router.add_get(
             '/nodes/{node_id}/trees',
             handler.get_node_trees,
+            name='get_node_trees',
+        )
+        self.app.router.add_get(
+            '/nodes/{node_id}/subgraph',
+            handler.get_node_subgraph,
+            name='get_node_subgraph',
+        )
+        self.app.router.add_post(
+            '/nodes/query',
+            handler.post_nodes_query,
+            name='post_nodes_query',
+        )
+        self.app.router.add_get(
+            '/nodes/topo',
+            handler.get_topo,
+            name='get_topo',
+        )
+        self.app.router.add_get(
+            '/nodes/{node_id}/depth',
+            handler.get_node_depth,
+            name='get_node_depth',
+        )
+        self.app.router.add_post(
+            '/reachability',
+            handler.post_reachability,
+            name='post_reachability',
+        )
+        self.app.router.add_get(
+            '/metrics',
+            handler.get_metrics,
+            name='get_metrics',
+        )
+        self.app.router.add_get(
+            '/ready',
+            self.get_ready,
+            name='get_ready',
+        )
+        self.app.router.add_get(
+            '/debug/memory',
+            handler.get_debug_memory,
+            name='get_debug_memory',
         )
 
     async def _middleware(self):
-        pass
+        # the outermost middleware goes first, shed load before taking
+        # any connection
+        if self.config.get('admission'):
+            self.app.middlewares.append(
+                middlewares.admission(self.admission, self._handler.cost),
+            )
+
+        if self._backend.resource == 'pg':
+            self.app.middlewares.append(
+                middlewares.connection_scope(self.resources.pg()),
+            )
 
     async def init_app(self):
         await self._init_resources()
+        await self._on_start()
         await self._on_close()
         await self._routes()
         await self._middleware()
 
+    async def cmd_migrate(self):
+        """Add the depths and leaf rows to a ``graph`` table created by an
+        older version."""
+        resource = self.resources.pg()
+        await resource.init_engine()
+
+        try:
+            await self.models.pg_graph().migrate()
+        finally:
+            await resource.close()
+
+        self.log.info('graph migrated')
+
+    async def cmd_rebuild_closure(self):
+        await self.resources.pg().init_engine()
+
+        model = self.models.pg_closure_graph()
+        await model.rebuild_closure()
+
+        self.log.info('closure rebuilt')
+
+    async def cmd_dump_snapshot(self, path):
+        """Write the configured backend graph as a snapshot ``mem`` mode
+        can start from (``mem.snapshot``)."""
+        await self._init_resources()
+
+        graph = await self._model.snapshot()
+        with open(path, 'w') as f:
+            snapshot.dump(graph, f)
+
+        resource = self._resource()
+        if resource is not None:
+            await resource.close()
+
+        self.log.info('{} vertexes written to {}'.format(len(graph), path))
+
+    async def cmd_memory(self):
+        """Print the ``GET /debug/memory`` report of the configured backend
+        once warmed up (``mem`` - loaded from ``mem.snapshot``)."""
+        await self._init_resources()
+        await self._model.warm()
+
+        print(json.dumps(await self._model.memory(), indent=2))
+
+        resource = self._resource()
+        if resource is not None:
+            await resource.close()
+
+    def run_command(self, command, *args):
+        try:
+            cmd = getattr(self, 'cmd_' + command.replace('-', '_'))
+        except AttributeError:
+            raise SystemExit('Unknown command {}'.format(command))
+
+        self.loop.run_until_complete(cmd(*args))
+
     def run(self):
         self.app = web.Application(loop=self.loop)
 
@@ -0,0 +1,38 @@
+class Backend:
+    """How to bring up the storage backend of a ``db`` config value.
+
+    ``section`` is the config section of the backend, ``resource`` the
+    ``Resources`` engine to initialize first (if any) and ``model`` the
+    ``Models`` provider of the graph model; ``variants`` maps a flag of
+    the section to the provider to use instead when it is set.
+    """
+
+    def __init__(self, section, model, resource=None, variants=None):
+        self.section = section
+        self.model = model
+        self.resource = resource
+        self.variants = variants or {}
+
+    def options(self, config) -> dict:
+        return config.get(self.section) or {}
+
+    def model_name(self, config) -> str:
+        options = self.options(config)
+
+        for flag, model in self.variants.items():
+            if options.get(flag):
+                return model
+
+        return self.model
+
+
+BACKENDS = {
+    'mem': Backend('mem', 'mem_graph'),
+    'pg': Backend(
+        'postgres',
+        'pg_graph',
+        resource='pg',
+        variants={'closure': 'pg_closure_graph'},
+    ),
+    'sqlite': Backend('sqlite', 'sqlite_graph', resource='sqlite'),
+}
@@ -1,17 +1,58 @@
+import json
 from logging import Logger
 
 from aiohttp import web
 
+from ...lib.admission import Admission
 from ...lib.graph import InconsistentState
+from ...lib.memory import HeapTracer
+from ...lib.subgraph import csr, ndjson
 from .resource import ABCGraphModel
-from .trafarets import NodesTrafaret
+from .trafarets import (EdgesTrafaret, MemoryQueryTrafaret,
+                        NodesQueryTrafaret, NodesTrafaret,
+                        ReachabilityTrafaret, SubgraphQueryTrafaret,
+                        TopoQueryTrafaret)
 
 
 class NodesHandler:
 
-    def __init__(self, graph: ABCGraphModel, log: Logger):
+    # request body list whose length estimates the cost of a route
+    _batch_keys = {
+        'post_nodes': 'nodes',
+        'post_nodes_query': 'nodes',
+        'post_reachability': 'pairs',
+        'delete_edges': 'edges',
+    }
+
+    def __init__(
+        self,
+        graph: ABCGraphModel,
+        log: Logger,
+        admission: Admission = None,
+    ):
         self.log = log
         self.graph = graph
+        self.admission = admission
+        self.heap = HeapTracer()
+
+    async def cost(self, request) -> int:
+        """Rough estimate of the work ``request`` is going to take."""
+        route = request.match_info.route.name
+
+        if (
+            route in ('get_node_trees', 'get_node_subgraph') and
+            self.graph.trees_cache is not None
+        ):
+            return self.graph.trees_cache.cone_size(
+                request.match_info['node_id'],
+                1,
+            )
+
+        if route in self._batch_keys:
+            data = await request.json()
+            return max(1, len(data.get(self._batch_keys[route]) or ()))
+
+        return 1
 
     async def post_nodes(self, request):
         data = await request.json()
@@ -26,6 +67,24 @@ class NodesHandler:
 
         return web.HTTPOk()
 
+    async def delete_node(self, request):
+        vertex = request.match_info['node_id']
+
+        if not await self.graph.has_vertex(vertex):
+            self.log.warning('{edge} not found'.format(edge=vertex))
+            return web.HTTPNotFound()
+
+        await self.graph.delete_vertex(vertex)
+
+        return web.HTTPOk()
+
+    async def delete_edges(self, request):
+        data = EdgesTrafaret.check(await request.json())
+
+        await self.graph.delete(data['edges'])
+
+        return web.HTTPOk()
+
     async def get_vertexes(self, request):
         return web.json_response(data=list(await self.graph.vertexes()))
 
@@ -43,3 +102,125 @@ class NodesHandler:
             return web.HTTPInternalServerError()
 
         return web.json_response(data={'trees': trees_json})
+
+    # format -> (encoder, content type) of a streamed subgraph
+    _subgraph_formats = {
+        'ndjson': (ndjson, 'application/x-ndjson'),
+        'csr': (csr, 'application/octet-stream'),
+    }
+
+    async def get_node_subgraph(self, request):
+        data = SubgraphQueryTrafaret.check(dict(request.query))
+        vertex = request.match_info['node_id']
+
+        subgraph = await self.graph.subgraph(
+            vertex,
+            data.get('up'),
+            data.get('down'),
+        )
+        if subgraph is None:
+            self.log.warning('{edge} not found'.format(edge=vertex))
+            return web.HTTPNotFound()
+
+        encode, content_type = self._subgraph_formats[data['format']]
+
+        response = web.StreamResponse()
+        response.content_type = content_type
+        await response.prepare(request)
+
+        for chunk in encode(subgraph):
+            await response.write(chunk)
+
+        await response.write_eof()
+
+        return response
+
+    async def post_nodes_query(self, request):
+        data = NodesQueryTrafaret.check(await request.json())
+        operation = data['operation']
+
+        async def items():
+            async for vertex, result in self.graph.query(
+                data['nodes'],
+                operation,
+            ):
+                if result is None:
+                    yield {'id': vertex, 'error': 'not found'}
+                else:
+                    yield {'id': vertex, operation: result}
+
+        return await self._stream_ndjson(request, items())
+
+    async def get_topo(self, request):
+        data = TopoQueryTrafaret.check(dict(request.query))
+        vertex = data.get('vertex')
+
+        if vertex is not None and not await self.graph.has_vertex(vertex):
+            self.log.warning('{edge} not found'.format(edge=vertex))
+            return web.HTTPNotFound()
+
+        async def items():
+            async for v, depth in self.graph.topo(vertex, data['direction']):
+                yield {'id': v, 'depth': depth}
+
+        return await self._stream_ndjson(request, items())
+
+    async def get_node_depth(self, request):
+        edge = request.match_info['node_id']
+
+        depth = await self.graph.depth(edge)
+        if depth is None:
+            self.log.warning('{edge} not found'.format(edge=edge))
+            return web.HTTPNotFound()
+
+        return web.json_response(data={'depth': depth})
+
+    async def post_reachability(self, request):
+        data = ReachabilityTrafaret.check(await request.json())
+
+        reachable = await self.graph.reachability(data['pairs'])
+
+        return web.json_response(data={'reachable': reachable})
+
+    async def _stream_ndjson(self, request, items):
+        response = web.StreamResponse()
+        response.content_type = 'application/x-ndjson'
+        await response.prepare(request)
+
+        try:
+            async for item in items:
+                await response.write(json.dumps(item).encode() + b'\n')
+        except Exception as e:
+            self.log.exception(e)
+            # the status is already sent, the trailer tells the client the
+            # stream is incomplete
+            await response.write(
+                json.dumps({'error': 'internal server error'}).encode() +
+                b'\n'
+            )
+
+        await response.write_eof()
+
+        return response
+
+    async def get_metrics(self, request):
+        metrics = await self.graph.metrics()
+
+        if self.admission is not None:
+            metrics['admission'] = self.admission.stats()
+
+        return web.json_response(data=metrics)
+
+    async def get_debug_memory(self, request):
+        data = MemoryQueryTrafaret.check(dict(request.query))
+
+        report = await self.graph.memory()
+
+        if data.get('tracemalloc') == 'diff':
+            diff = self.heap.diff()
+            report['tracemalloc'] = dict(self.heap.stats(), diff=diff)
+        elif data.get('tracemalloc') == 'stop':
+            self.heap.stop()
+            report['tracemalloc'] = self.heap.stats()
+
+        return web.json_response(data=report)
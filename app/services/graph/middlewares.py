@@ -0,0 +1,64 @@
+from aiohttp import web
+
+from ...lib.admission import Admission, Overloaded
+
+
+def admission(control: Admission, cost_f):
+    """Admit requests through the :class:`Gate` of their route.
+
+    ``cost_f(request)`` estimates the cost of a request, cheap ones are
+    admitted first. Rejected requests get the status of the gate with
+    ``Retry-After`` at once; requests whose client went away while
+    waiting are dropped without running the handler.
+    """
+
+    async def factory(app, handler):
+        async def middleware(request):
+            name = request.match_info.route.name
+            gate = control.gate(name) if name else None
+
+            if gate is None:
+                return await handler(request)
+
+            try:
+                cost = await cost_f(request)
+            except Exception:
+                cost = 1
+
+            try:
+                await gate.acquire(cost)
+            except Overloaded as e:
+                return web.Response(
+                    status=gate.status,
+                    text=e.reason,
+                    headers={'Retry-After': str(gate.retry_after)},
+                )
+
+            try:
+                transport = request.transport
+                if transport is None or transport.is_closing():
+                    return web.Response(
+                        status=499,
+                        reason='Client Closed Request',
+                    )
+
+                return await handler(request)
+            finally:
+                gate.release()
+
+        return middleware
+
+    return factory
+
+
+def connection_scope(pg_engine):
+    """Serve every request with at most one pooled pg connection."""
+
+    async def factory(app, handler):
+        async def middleware(request):
+            async with pg_engine.scope():
+                return await handler(request)
+
+        return middleware
+
+    return factory
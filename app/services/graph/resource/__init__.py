@@ -1,17 +1,52 @@
 import abc
+from itertools import chain
+
+from ....lib.memory import sizeof
 
 
 class ABCGraphModel(metaclass=abc.ABCMeta):
 
     _cast = None
 
+    trees_cache = None
+
+    _reachability = None
+
+    # stored graph version the trees cache is known to be consistent with
+    _cache_version = None
+
     @abc.abstractmethod
     async def init(self):
         pass
 
     @abc.abstractmethod
-    async def insert(self, vertexes):
-        pass
+    async def insert(self, vertexes, checked_version=None):
+        """Insert the edges and return the :meth:`version` they produced.
+
+        ``checked_version`` tells that the caller already checked the batch
+        for cycles against the graph as of that version; backends may skip
+        their own check if nobody wrote since.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, edges) -> int:
+        """Delete the edges (given like to :meth:`insert`), their vertexes
+        stay; unknown edges are ignored. Return the :meth:`version`."""
+
+    @abc.abstractmethod
+    async def delete_vertex(self, vertex) -> int:
+        """Delete ``vertex`` with all its edges, return the :meth:`version`.
+        """
+
+    @abc.abstractmethod
+    async def version(self) -> int:
+        """Change counter of the stored graph, incremented by every insert
+        whoever makes it."""
+
+    @abc.abstractmethod
+    async def adjacency(self, vertexes, direction) -> dict:
+        """One-hop neighbours of every vertex of the batch, ``down`` -
+        children, ``up`` - parents; unknown vertexes get an empty set."""
 
     @abc.abstractmethod
     async def vertexes(self):
@@ -25,6 +60,95 @@ class ABCGraphModel(metaclass=abc.ABCMeta):
     async def trees(self, vertex):
         pass
 
+    @abc.abstractmethod
+    async def query(self, vertexes, operation):
+        """Yield ``(vertex, result)`` for every vertex of the batch.
+
+        ``result`` is ``None`` for unknown vertexes.
+        """
+
+    @abc.abstractmethod
+    async def topo(self, vertex=None, direction='both'):
+        """Yield ``(vertex, depth)`` in topological order.
+
+        With ``vertex`` given only its cone is yielded: ``down`` -
+        descendants, ``up`` - ancestors, ``both`` - both, the vertex itself
+        included.
+        """
+
+    @abc.abstractmethod
+    async def subgraph(self, vertex, up=None, down=None):
+        """Induced ``DiGraph`` on ``vertex`` and the vertexes at most ``up``
+        hops above and ``down`` hops below it (``None`` - any), ``None``
+        if the vertex is unknown."""
+
+    @abc.abstractmethod
+    async def depth(self, vertex):
+        """Longest path from a source to ``vertex``, ``None`` if unknown."""
+
+    @abc.abstractmethod
+    async def reachability(self, pairs) -> list:
+        """For every ``(a, b)`` pair tell whether ``b`` is reachable from
+        ``a`` (every vertex reaches itself)."""
+
+    @abc.abstractmethod
+    async def snapshot(self):
+        """Point-in-time copy of the whole graph as an ``AcyclicDiGraph``."""
+
+    async def warm(self):
+        """Get ready to serve: load data, build indexes. Runs once in the
+        background while the service starts listening."""
+
+    async def metrics(self) -> dict:
+        return {'trees_cache': self.trees_cache.stats()}
+
+    async def memory(self) -> dict:
+        """Approximate bytes held in process, see ``GET /debug/memory``."""
+        sizes = {
+            'trees_cache': sizeof(self.trees_cache),
+            'reachability': sizeof(self._reachability),
+        }
+
+        return {'bytes': sizes, 'total_bytes': sum(sizes.values())}
+
+    def _sync_caches(self, version):
+        """Drop the trees cache if the stored graph moved past the version
+        it was filled at, e.g. written by another process sharing it."""
+        if version != self._cache_version:
+            self.trees_cache.clear()
+            self._cache_version = version
+
+    def _invalidate(self, version, *vertexes):
+        # own write: invalidate in place, the cache stays in sync only if
+        # nobody else wrote since
+        self.trees_cache.invalidate(*vertexes)
+
+        if version - 1 == self._cache_version:
+            self._cache_version = version
+
+    async def _trees(self, vertex, traversal):
+        trees = self.trees_cache.get(vertex)
+
+        if trees is None:
+            generation = self.trees_cache.generation
+            trees = await traversal.trees(vertex)
+
+            self.trees_cache.put(
+                vertex,
+                trees,
+                cone=chain.from_iterable(trees),
+                weight=len(trees),
+                generation=generation,
+            )
+
+        return trees
+
+    async def _run(self, operation, vertex, traversal):
+        if operation == 'trees':
+            return await self._trees(vertex, traversal)
+
+        return await traversal.run(operation, vertex)
+
     def _normalize_edge(self, edge):
         if edge.get('parent', None) is None:
             if self._cast:
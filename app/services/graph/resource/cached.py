@@ -0,0 +1,277 @@
+import time
+
+from . import ABCGraphModel
+from ....lib.cache import LRUCache
+from ....lib.graph import AcyclicDiGraph, DiGraph, InconsistentState
+from ....lib.memory import sizeof
+from ....lib.traversal import MemoizedTraversal
+
+
+class CachedGraphModel(ABCGraphModel):
+    """Read-through adjacency cache in front of another graph model.
+
+    Adjacency sets of both directions are kept in LRU caches filled on
+    demand with :meth:`ABCGraphModel.adjacency`, so trees and cycle checks
+    over hot vertexes are answered in-process.  Inserts are checked for
+    cycles against the cache, written to the backend with the version the
+    check was made at (the backend skips its own check if nobody wrote
+    since) and applied to the cache write-through.
+
+    Writes of other processes are noticed through the backend change
+    version, read at most every ``check_interval`` seconds: when it moved
+    both caches and the trees cache are dropped.  Cached sets are never
+    mutated, write-through replaces them, so running traversals keep a
+    consistent view.
+    """
+
+    def __init__(
+        self,
+        backend: ABCGraphModel,
+        maxsize=65536,
+        check_interval=0.0,
+    ):
+        self.backend = backend
+        self._cast = backend._cast
+        self.trees_cache = backend.trees_cache
+
+        self.adjacency_cache = {
+            'down': LRUCache(maxsize),
+            'up': LRUCache(maxsize),
+        }
+        self.check_interval = check_interval
+
+        self._version = None
+        self._checked_at = None
+        # bumped whenever the cache changes under an in-flight fetch
+        self._generation = 0
+
+        self.version_checks = 0
+        self.resyncs = 0
+
+    @classmethod
+    def from_config(cls, backend, config, section, name='adjacency_cache'):
+        options = (config.get(section) or {}).get(name) or {}
+
+        return cls(
+            backend,
+            maxsize=options.get('maxsize', 65536),
+            check_interval=options.get('check_interval', 0.0),
+        )
+
+    async def init(self):
+        await self.backend.init()
+
+        self._reset(await self.backend.version())
+
+    async def warm(self):
+        await self.backend.warm()
+
+    async def version(self) -> int:
+        return await self.backend.version()
+
+    async def _sync(self):
+        now = time.monotonic()
+
+        if self._checked_at is not None and (
+            now - self._checked_at < self.check_interval
+        ):
+            return
+
+        self._checked_at = now
+        self.version_checks += 1
+
+        version = await self.backend.version()
+        if version != self._version:
+            self._reset(version)
+
+    def _reset(self, version):
+        if self._version is not None:
+            self.resyncs += 1
+
+        for cache in self.adjacency_cache.values():
+            cache.clear()
+        self.trees_cache.clear()
+
+        self._generation += 1
+        self._version = version
+
+    async def adjacency(self, vertexes, direction) -> dict:
+        cache = self.adjacency_cache[direction]
+
+        adjacency, missing = {}, []
+        for v in vertexes:
+            vs = cache.get(v)
+            if vs is None:
+                missing.append(v)
+            else:
+                adjacency[v] = vs
+
+        if missing:
+            generation = self._generation
+            fetched = await self.backend.adjacency(missing, direction)
+
+            for v, vs in fetched.items():
+                adjacency[v] = vs = frozenset(vs)
+
+                if generation == self._generation:
+                    cache.put(v, vs)
+
+        return adjacency
+
+    async def _adjacent(self, vertex, direction):
+        return (await self.adjacency([vertex], direction))[vertex]
+
+    def _traversal(self) -> MemoizedTraversal:
+        async def _descendants(v):
+            return await self._adjacent(v, 'down')
+
+        async def _ancestors(v):
+            return await self._adjacent(v, 'up')
+
+        return MemoizedTraversal(_descendants, _ancestors)
+
+    async def insert(self, edges, checked_version=None):
+        await self._sync()
+
+        checked = self._version
+        batch = DiGraph.from_edges(map(self._normalize_edge, edges))
+
+        async def _descendants(v):
+            vs = await self._adjacent(v, 'down')
+            return vs | batch.vertexes_to(v) if batch.vertexes_to(v) else vs
+
+        if await AcyclicDiGraph.ahas_cycle(
+            _descendants,
+            [v for v in batch.vertexes() if batch.vertexes_to(v)],
+            seen=set(),
+        ):
+            raise InconsistentState()
+
+        version = await self.backend.insert(
+            list(edges),
+            checked_version=checked,
+        )
+        self._apply(version, batch)
+
+        return version
+
+    async def delete(self, edges):
+        await self._sync()
+
+        batch = DiGraph.from_edges(
+            edge for edge in map(self._normalize_edge, edges)
+            if edge[1] is not None
+        )
+
+        version = await self.backend.delete(list(edges))
+        self._apply(version, batch, removed=True)
+
+        return version
+
+    async def delete_vertex(self, vertex):
+        await self._sync()
+
+        # the edges to drop from the neighbours' cached sets
+        batch = DiGraph()
+        for v_to in await self._adjacent(vertex, 'down'):
+            batch.insert(vertex, v_to)
+        for v_from in await self._adjacent(vertex, 'up'):
+            batch.insert(v_from, vertex)
+
+        version = await self.backend.delete_vertex(vertex)
+        if self._apply(version, batch, removed=True):
+            for cache in self.adjacency_cache.values():
+                cache.pop(vertex)
+
+        return version
+
+    def _apply(self, version, batch: DiGraph, removed=False) -> bool:
+        """Catch up with the ``version`` a write of ``batch`` produced.
+
+        Return whether the batch was written through, otherwise somebody
+        else wrote in between and the caches are reset.
+        """
+        if version == self._version + 1:
+            self._write_through(batch, removed)
+            self._version = version
+            return True
+
+        if version > self._version:
+            self._reset(version)
+
+        return False
+
+    def _write_through(self, batch: DiGraph, removed=False):
+        self._generation += 1
+
+        for direction, adjacent in (
+            ('down', batch.vertexes_to),
+            ('up', batch.vertexes_from),
+        ):
+            cache = self.adjacency_cache[direction]
+
+            for v in batch.vertexes():
+                vs = cache.peek(v)
+                if vs is None or not adjacent(v):
+                    pass
+                elif removed:
+                    cache.put(v, vs - adjacent(v))
+                else:
+                    cache.put(v, vs | adjacent(v))
+
+    async def vertexes(self):
+        return await self.backend.vertexes()
+
+    async def has_vertex(self, vertex):
+        return await self.backend.has_vertex(vertex)
+
+    async def trees(self, vertex):
+        await self._sync()
+
+        return await self._trees(vertex, self._traversal())
+
+    async def query(self, vertexes, operation):
+        await self._sync()
+
+        traversal = self._traversal()
+
+        for vertex in vertexes:
+            if await self.backend.has_vertex(vertex):
+                yield vertex, await self._run(operation, vertex, traversal)
+            else:
+                yield vertex, None
+
+    async def topo(self, vertex=None, direction='both'):
+        async for row in self.backend.topo(vertex, direction):
+            yield row
+
+    async def subgraph(self, vertex, up=None, down=None):
+        return await self.backend.subgraph(vertex, up, down)
+
+    async def depth(self, vertex):
+        return await self.backend.depth(vertex)
+
+    async def reachability(self, pairs) -> list:
+        return await self.backend.reachability(pairs)
+
+    async def snapshot(self) -> AcyclicDiGraph:
+        return await self.backend.snapshot()
+
+    async def metrics(self) -> dict:
+        metrics = await self.backend.metrics()
+        metrics['adjacency_cache'] = {
+            'version': self._version,
+            'version_checks': self.version_checks,
+            'resyncs': self.resyncs,
+        }
+        for direction, cache in self.adjacency_cache.items():
+            metrics['adjacency_cache'][direction] = cache.stats()
+
+        return metrics
+
+    async def memory(self) -> dict:
+        report = await self.backend.memory()
+        report['bytes']['adjacency_cache'] = sizeof(self.adjacency_cache)
+        report['total_bytes'] = sum(report['bytes'].values())
+
+        return report
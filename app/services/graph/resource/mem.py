@@ -1,77 +1,225 @@
+import asyncio
 from typing import Iterator
 
 from . import ABCGraphModel
-from ....lib.graph import AcyclicDiGraph
+from ....lib import snapshot
+from ....lib.cache import ConeCache
+from ....lib.components import ComponentValidator
+from ....lib.graph import AcyclicDiGraph, DiGraph
+from ....lib.memory import graph_memory, sizeof
+from ....lib.reachability import ReachabilityIndex
+from ....lib.subgraph import induced, within
+from ....lib.topo import TopologicalLayers
+from ....lib.traversal import MemoizedTraversal
 
 
 class InMemoryGraphModel(ABCGraphModel):
 
-    def __init__(self, graph: AcyclicDiGraph = None):
+    def __init__(
+        self,
+        graph: AcyclicDiGraph = None,
+        trees_cache: ConeCache = None,
+        snapshot_path: str = None,
+        validator: ComponentValidator = None,
+    ):
         self.graph = graph or AcyclicDiGraph()
-        self.inv_graph = self.graph.reverse()
+        self.layers = TopologicalLayers(self.graph)
+        self._reachability = None
+        self._version = 0
+        self.trees_cache = ConeCache() if trees_cache is None else trees_cache
+        self.snapshot_path = snapshot_path
+        self.validator = validator
 
     async def init(self):
         pass
 
+    async def warm(self):
+        if not self.snapshot_path:
+            return
+
+        graph, layers, reachability = await asyncio.get_event_loop(
+        ).run_in_executor(None, self._load, self.snapshot_path)
+
+        if not len(self.graph):
+            self.graph, self.layers = graph, layers
+            self._reachability = reachability
+        else:
+            # inserted while loading
+            self.graph.union_update(graph)
+            self.layers.update(
+                graph.vertexes(),
+                [v for v in graph.vertexes() if graph.vertexes_to(v)],
+            )
+            self._reachability = None
+
+        self._version += 1
+        self.trees_cache.clear()
+
+    @staticmethod
+    def _load(path):
+        with open(path) as f:
+            graph = AcyclicDiGraph.from_edges(snapshot.load(f), strict=False)
+
+        layers = TopologicalLayers(graph)
+
+        return graph, layers, ReachabilityIndex.from_graph(graph, layers)
+
     async def vertexes(self):
         return self.graph.vertexes()
 
     async def has_vertex(self, edge):
         return self.graph.has_vertex(edge)
 
-    async def insert(self, edges):
+    async def insert(self, edges, checked_version=None):
         if len(edges) == 1:
             await self._insert_one(edges.pop())
         elif len(edges) > 1:
             await self._insert_many(edges)
+        else:
+            return self._version
+
+        self._version += 1
+
+        return self._version
+
+    async def version(self) -> int:
+        return self._version
+
+    async def adjacency(self, vertexes, direction) -> dict:
+        if direction == 'down':
+            adjacent = self.graph.vertexes_to
+        else:
+            adjacent = self.graph.vertexes_from
+
+        return {v: set(adjacent(v)) for v in vertexes}
 
     async def _insert_one(self, edge):
         v_from, v_to = self._normalize_edge(edge)
 
         self.graph.insert(v_from, v_to)
-        self.inv_graph.insert(v_to, v_from, strict=False)
+        self.layers.insert(v_from, v_to)
+        self._reachability = None
+        self.trees_cache.invalidate(v_from, v_to)
 
     async def _insert_many(self, edges):
-        tmp = AcyclicDiGraph()
+        tmp = DiGraph.from_edges(map(self._normalize_edge, edges))
 
-        for edge in edges:
-            v_from, v_to = self._normalize_edge(edge)
-            tmp.insert(v_from, v_to)
+        self.graph.union_update(tmp, validator=self.validator)
+        self.layers.update(
+            tmp.vertexes(),
+            [v for v in tmp.vertexes() if tmp.vertexes_to(v)],
+        )
+        self._reachability = None
+        self.trees_cache.invalidate(*tmp.vertexes())
 
-        self.graph.union(tmp)
-        self.inv_graph.union(tmp.reverse(), strict=False)
+    async def delete(self, edges):
+        removed = [
+            (v_from, v_to)
+            for v_from, v_to in map(self._normalize_edge, edges)
+            if v_to is not None and self.graph.remove(v_from, v_to)
+        ]
 
-    async def trees(self, vertex) -> Iterator[list]:
+        if removed:
+            self.layers.remove((), [v_to for _, v_to in removed])
+            self._reachability = None
+            self.trees_cache.invalidate(*{v for edge in removed for v in edge})
+
+        self._version += 1
 
-        def collect_subtrees(
-                graph: AcyclicDiGraph,
-                start_node,
-                stack=None,
-        ) -> Iterator[list]:
-            stack = stack or []
+        return self._version
 
-            stack.append(start_node)
+    async def delete_vertex(self, vertex):
+        children = set(self.graph.vertexes_to(vertex))
 
-            vs_out = graph.vertexes_to(start_node)
-            if len(vs_out) == 0:
-                yield stack.copy()
-                stack.pop()
-                return
+        if self.graph.remove_vertex(vertex):
+            self.layers.remove([vertex], children)
+            self._reachability = None
+            self.trees_cache.invalidate(vertex)
 
-            for v_out in vs_out:
-                yield from collect_subtrees(graph, v_out, stack)
+        self._version += 1
 
-            stack.pop()
+        return self._version
 
-        child_subtrees = list(collect_subtrees(self.graph, vertex))
-        parent_subtrees = list(collect_subtrees(self.inv_graph, vertex))
+    def _traversal(self) -> MemoizedTraversal:
+        inv_graph = self.graph.reverse()
 
-        result = []
-        for parent_subtree in parent_subtrees:
-            parent_subtree = list(reversed(parent_subtree))
-            parent_subtree.pop()
+        async def _descendants(v):
+            return self.graph.vertexes_to(v)
 
-            for child_subtree in child_subtrees:
-                result.append(parent_subtree + child_subtree)
+        async def _ancestors(v):
+            return inv_graph.vertexes_to(v)
 
-        return result
+        return MemoizedTraversal(_descendants, _ancestors)
+
+    async def trees(self, vertex) -> Iterator[list]:
+        return await self._trees(vertex, self._traversal())
+
+    async def query(self, vertexes, operation):
+        traversal = self._traversal()
+
+        for vertex in vertexes:
+            if self.graph.has_vertex(vertex):
+                yield vertex, await self._run(operation, vertex, traversal)
+            else:
+                yield vertex, None
+
+    async def topo(self, vertex=None, direction='both'):
+        if vertex is None:
+            for layer in list(self.layers.layers):
+                for v in list(layer):
+                    yield v, self.layers.depth(v)
+        else:
+            cone = await self._traversal().cone(vertex, direction)
+
+            for v in self.layers.order(cone):
+                yield v, self.layers.depth(v)
+
+    async def subgraph(self, vertex, up=None, down=None):
+        if not self.graph.has_vertex(vertex):
+            return None
+
+        vertexes = within(self.graph.vertexes_to, vertex, down)
+        vertexes |= within(self.graph.vertexes_from, vertex, up)
+
+        return induced(self.graph.vertexes_to, vertexes)
+
+    async def depth(self, vertex):
+        return self.layers.depth(vertex)
+
+    async def reachability(self, pairs) -> list:
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex.from_graph(
+                self.graph,
+                self.layers,
+            )
+
+        reachable = await asyncio.get_event_loop().run_in_executor(
+            None,
+            self._reachability.reaches,
+            pairs,
+        )
+
+        return reachable.tolist()
+
+    async def snapshot(self) -> AcyclicDiGraph:
+        return self.graph
+
+    async def memory(self) -> dict:
+        report = graph_memory(self.graph.di_graph)
+
+        # vertexes are counted once, under ``vertex_objects``
+        exclude = {id(v) for v in self.graph.vertexes()}
+        exclude.update((id(self.graph), id(self.graph.di_graph)))
+
+        report['bytes'].update(
+            layers=sizeof(self.layers, exclude),
+            reachability=sizeof(self._reachability, exclude),
+            trees_cache=sizeof(self.trees_cache, exclude),
+        )
+        report['total_bytes'] = sum(report['bytes'].values())
+        report['bytes_per_edge'] = round(
+            report['total_bytes'] / max(1, report['edges']),
+            1,
+        )
+
+        return report
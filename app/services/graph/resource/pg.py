@@ -1,18 +1,158 @@
-from functools import partial
+import asyncio
+import weakref
 
 from aiopg import sa
 
 from . import ABCGraphModel
-from ....lib.graph import AcyclicDiGraph, InconsistentState
+from ....lib.cache import ConeCache
+from ....lib.graph import AcyclicDiGraph, DiGraph, InconsistentState
+from ....lib.metrics import Timings
+from ....lib.reachability import ReachabilityIndex
+from ....lib.subgraph import induced
+from ....lib.traversal import MemoizedTraversal
+
+
+# name: (argument types, statement), prepared once per connection
+STATEMENTS = {
+    'has_vertex': (
+        ('text',),
+        'select 1 from graph where vertex = $1',
+    ),
+    'descendants': (
+        ('text',),
+        'select vertex_out from graph where vertex = $1',
+    ),
+    'ancestors': (
+        ('text',),
+        'select vertex from graph where vertex_out @> array[$1]',
+    ),
+    'adjacency_down': (
+        ('text[]',),
+        'select vertex, vertex_out from graph where vertex = any($1)',
+    ),
+    'adjacency_up': (
+        ('text[]',),
+        'select vertex, vertex_out from graph where vertex_out && $1',
+    ),
+    'depth': (
+        ('text',),
+        'select depth from graph where vertex = $1',
+    ),
+    'version': (
+        (),
+        'select version from graph_version',
+    ),
+    'bump_version': (
+        (),
+        '''update graph_version set version = version + 1
+        returning version''',
+    ),
+    'insert_edge': (
+        ('text', 'text'),
+        '''insert into graph as g (vertex, vertex_out)
+        values ($1, array[$2])
+        on conflict (vertex) do
+        update set
+        vertex_out = array_append(array_remove(g.vertex_out, $2), $2)
+        ''',
+    ),
+    'insert_leaf': (
+        ('text',),
+        '''insert into graph (vertex, vertex_out)
+        values ($1, '{}')
+        on conflict (vertex) do nothing''',
+    ),
+    'closure_reaches': (
+        ('text', 'text'),
+        '''select 1 from graph_closure
+        where ancestor = $1 and descendant = $2''',
+    ),
+}
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except AttributeError:
+        return asyncio.Task.current_task()
+
+
+class _Acquire:
+
+    def __init__(self, pg_engine):
+        self.pg_engine = pg_engine
+        self._context = None
+
+    async def __aenter__(self):
+        scope = self.pg_engine._scopes.get(_current_task())
+
+        if scope is not None:
+            return await scope.connection()
+
+        self._context, conn = await self.pg_engine._acquire()
+        return conn
+
+    async def __aexit__(self, *exc_info):
+        if self._context is not None:
+            await self._context.__aexit__(*exc_info)
+
+
+class _Scope:
+
+    def __init__(self, pg_engine):
+        self.pg_engine = pg_engine
+        self._task = None
+        self._context = None
+        self._conn = None
+
+    async def connection(self):
+        if self._conn is None:
+            self._context, self._conn = await self.pg_engine._acquire()
+
+        return self._conn
+
+    async def __aenter__(self):
+        task = _current_task()
+
+        # nested scopes share the outermost one
+        if task not in self.pg_engine._scopes:
+            self._task = task
+            self.pg_engine._scopes[task] = self
+
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._task is not None:
+            del self.pg_engine._scopes[self._task]
+
+        if self._context is not None:
+            await self._context.__aexit__(*exc_info)
 
 
 class PgEngine:
+    """aiopg engine with per-connection prepared statements.
+
+    :meth:`execute` runs a statement of :data:`STATEMENTS` by name,
+    preparing it first on connections that have not seen it yet, so the
+    server parses and plans hot queries once per connection.
+
+    Inside :meth:`scope` every :meth:`acquire` of the task returns the
+    same lazily acquired connection, e.g. one per HTTP request.
+    """
+
+    statements = STATEMENTS
 
     def __init__(self, config, loop):
         self.config = config['postgres']
         self.loop = loop
         self._engine = None
 
+        self._scopes = {}
+        self._prepared = weakref.WeakKeyDictionary()
+
+        self.acquire_timings = Timings()
+        self.statement_timings = Timings()
+
     async def init_engine(self):
         self._engine = await sa.create_engine(
             database=self.config['database'],
@@ -28,6 +168,61 @@ class PgEngine:
     def engine(self) -> sa.Engine:
         return self._engine
 
+    def acquire(self) -> _Acquire:
+        return _Acquire(self)
+
+    def scope(self) -> _Scope:
+        return _Scope(self)
+
+    async def _acquire(self):
+        context = self._engine.acquire()
+
+        with self.acquire_timings.time('acquire'):
+            conn = await context.__aenter__()
+
+        return context, conn
+
+    async def execute(self, conn, name, *args):
+        prepared = self._prepared.setdefault(conn.connection, set())
+
+        if name not in prepared:
+            types, statement = self.statements[name]
+
+            await conn.execute(
+                'PREPARE {}{} AS {}'.format(
+                    name,
+                    ' ({})'.format(', '.join(types)) if types else '',
+                    statement,
+                )
+            )
+            prepared.add(name)
+
+        with self.statement_timings.time(name):
+            if not args:
+                return await conn.execute('EXECUTE {}'.format(name))
+
+            return await conn.execute(
+                'EXECUTE {} ({})'.format(name, ', '.join(['%s'] * len(args))),
+                *args
+            )
+
+    async def deallocate(self, conn):
+        await conn.execute('DEALLOCATE ALL')
+        self._prepared.pop(conn.connection, None)
+
+    def stats(self) -> dict:
+        return {
+            'pool': {
+                'size': self._engine.size,
+                'freesize': self._engine.freesize,
+                'minsize': self._engine.minsize,
+                'maxsize': self._engine.maxsize,
+                'scopes': len(self._scopes),
+            },
+            'acquire': self.acquire_timings.stats().get('acquire'),
+            'statements': self.statement_timings.stats(),
+        }
+
     async def close(self):
         if self._engine:
             self._engine.close()
@@ -38,57 +233,118 @@ class PgGinGraphModel(ABCGraphModel):
 
     _cast = str
 
-    def __init__(self, pg_engine: PgEngine):
+    def __init__(self, pg_engine: PgEngine, trees_cache: ConeCache = None):
         self.pg_engine = pg_engine
+        self.trees_cache = ConeCache() if trees_cache is None else trees_cache
+        self._reachability = None
 
     async def init(self):
-        async with self.pg_engine.engine().acquire() as conn:
+        async with self.pg_engine.acquire() as conn:
             await conn.execute('DROP TABLE IF EXISTS graph')
             await conn.execute(
                 '''CREATE TABLE graph (
                         vertex text PRIMARY KEY,
-                        vertex_out text[]
+                        vertex_out text[],
+                        depth integer NOT NULL DEFAULT 0
                 )'''
             )
+            await conn.execute(
+                '''CREATE INDEX graph_depth_idx
+                    ON graph (depth, vertex)'''
+            )
             await conn.execute(
                 '''CREATE INDEX vertex_out_gin_idx
                     ON graph
                     USING gin (vertex_out)
                     WITH (fastupdate = off);'''
             )
+            await conn.execute('DROP TABLE IF EXISTS graph_version')
+            await self._create_version(conn)
+
+            await self.pg_engine.deallocate(conn)
+
+    async def _create_version(self, conn):
+        await conn.execute(
+            '''CREATE TABLE IF NOT EXISTS graph_version (
+                    id integer PRIMARY KEY CHECK (id = 1),
+                    version bigint NOT NULL
+            )'''
+        )
+        await conn.execute(
+            '''INSERT INTO graph_version VALUES (1, 0)
+                ON CONFLICT (id) DO NOTHING'''
+        )
+
+    async def version(self) -> int:
+        async with self.pg_engine.acquire() as conn:
+            return await self._version(conn)
+
+    async def _version(self, conn) -> int:
+        rows = await self.pg_engine.execute(conn, 'version')
+        return (await rows.fetchone()).version
+
+    async def _bump_version(self, conn) -> int:
+        # the row lock also serializes writers until commit
+        rows = await self.pg_engine.execute(conn, 'bump_version')
+        return (await rows.fetchone()).version
 
     async def has_vertex(self, vertex):
-        async with self.pg_engine.engine().acquire() as conn:
-            rows = await conn.execute(
-                "select vertex from graph where vertex = %s", vertex
-            )
-            return rows.rowcount == 1
+        async with self.pg_engine.acquire() as conn:
+            return await self._has_vertex(vertex, conn)
+
+    async def metrics(self) -> dict:
+        metrics = await super().metrics()
+        metrics['pg'] = self.pg_engine.stats()
+
+        return metrics
+
+    async def _has_vertex(self, vertex, conn=None):
+        rows = await self.pg_engine.execute(conn, 'has_vertex', vertex)
+        return rows.rowcount == 1
 
     async def vertexes(self):
-        async with self.pg_engine.engine().acquire() as conn:
+        async with self.pg_engine.acquire() as conn:
             rows = await conn.execute(
                 'select vertex from graph'
             )
             for row in rows:
                 yield row.vertex
 
-    async def insert(self, edges):
+    async def insert(self, edges, checked_version=None):
         if len(edges) == 1:
-            await self._insert_one(*self._normalize_edge(edges.pop()))
+            return await self._insert_one(
+                *self._normalize_edge(edges.pop()),
+                checked_version=checked_version
+            )
         elif len(edges) > 1:
-            await self._insert_many(list(map(self._normalize_edge, edges)))
+            return await self._insert_many(
+                list(map(self._normalize_edge, edges)),
+                checked_version=checked_version,
+            )
+
+        return await self.version()
+
+    async def _insert_one(self, v_from, v_to, checked_version=None):
+        if v_to is None:
+            return await self._insert_many(
+                [(v_from, v_to)],
+                checked_version=checked_version,
+            )
 
-    async def _insert_one(self, v_from, v_to):
-        async with self.pg_engine.engine().acquire() as conn:
+        async with self.pg_engine.acquire() as conn:
             async with conn.begin():
-                vtx_to = await self._descendants(v_from, conn) | {v_to}
+                adjacent = self._adjacent_f('down', conn)
 
                 async def _descendants(v):
-                    return vtx_to if v == v_from else await self._descendants(v, conn)  # noqa
+                    vs = await adjacent(v)
+                    return vs | {v_to} if v == v_from else vs
 
                 await conn.execute('lock graph in ROW EXCLUSIVE mode')
+                version = await self._bump_version(conn)
 
-                if await AcyclicDiGraph.ahas_cycle(
+                if version - 1 == checked_version:
+                    pass
+                elif await AcyclicDiGraph.ahas_cycle(
                     _descendants,
                     {v_from},
                     seen=set(),
@@ -98,21 +354,29 @@ class PgGinGraphModel(ABCGraphModel):
                     )
 
                 await self._insert_one_pg(v_from, v_to, conn)
+                await self._update_depths([v_from], conn)
 
-    async def _insert_many(self, edges):
-        tmp = AcyclicDiGraph()
+        self._invalidate(version, v_from, v_to)
+        self._reachability = None
 
-        for v_from, v_to in edges:
-            tmp.insert(v_from, v_to)
+        return version
 
-        async with self.pg_engine.engine().acquire() as conn:
+    async def _insert_many(self, edges, checked_version=None):
+        tmp = DiGraph.from_edges(edges)
+
+        async with self.pg_engine.acquire() as conn:
             async with conn.begin():
+                adjacent = self._adjacent_f('down', conn)
+
                 async def _descendants(v):
-                    return await self._descendants(v, conn) | tmp.vertexes_to(v)  # noqa
+                    return await adjacent(v) | tmp.vertexes_to(v)
 
                 await conn.execute('lock graph in ROW EXCLUSIVE mode')
+                version = await self._bump_version(conn)
 
-                if await AcyclicDiGraph.ahas_cycle(
+                if version - 1 == checked_version:
+                    pass
+                elif await AcyclicDiGraph.ahas_cycle(
                     _descendants,
                         set(filter(
                             lambda other_edge: len(
@@ -126,84 +390,241 @@ class PgGinGraphModel(ABCGraphModel):
                 for v_from, v_to in edges:
                     await self._insert_one_pg(v_from, v_to, conn)
 
+                await self._update_depths(
+                    [v for v in tmp.vertexes() if tmp.vertexes_to(v)],
+                    conn,
+                )
+
+        self._invalidate(version, *tmp.vertexes())
+        self._reachability = None
+
+        return version
+
     async def _insert_one_pg(self, v_from, v_to, conn):
         if v_to is None:
-            await conn.execute(
-                """insert into graph as g (vertex, vertex_out)
-                values(%s, '{}')
-                on conflict(vertex) do nothing
-                """,
-                v_from,
-            )
+            await self.pg_engine.execute(conn, 'insert_leaf', v_from)
         else:
-            await conn.execute(
-                """insert into graph as g (vertex, vertex_out)
-                values(%s, %s)
-                on conflict(vertex) do
-                update set
-                vertex_out = array_append(
-                  array_remove(g.vertex_out, %s),
-                  %s
-                )
-                """,
-                v_from,
-                [v_to],
-                v_to,
-                v_to
+            await self.pg_engine.execute(conn, 'insert_edge', v_from, v_to)
+            await self.pg_engine.execute(conn, 'insert_leaf', v_to)
+
+    async def _update_depths(self, sources, conn):
+        # push the longest-path layer down from ``sources`` (``None`` -
+        # every vertex) one level per round, each round only from the
+        # vertexes whose depth just grew: a vertex is visited once per
+        # level it moves, not once per path leading to it
+        where = 'true' if sources is None else 'p.vertex = any(%s)'
+        args = () if sources is None else (list(sources),)
+
+        while True:
+            rows = await conn.execute(
+                """update graph c set depth = m.depth
+                from (
+                    select v_out.vertex, max(p.depth) + 1 as depth
+                    from graph p, unnest(p.vertex_out) as v_out(vertex)
+                    where {where}
+                    group by v_out.vertex
+                ) m
+                where c.vertex = m.vertex and c.depth < m.depth
+                returning c.vertex""".format(where=where),
+                *args
             )
+            frontier = [row.vertex for row in await rows.fetchall()]
 
-    async def trees(self, vertex):
-        async def collect_subtrees(
-            descendants_f,
-            start_vertex,
-            stack=None,
-        ) -> list:
-            stack = stack or []
-
-            stack.append(start_vertex)
-
-            vs_out = await descendants_f(start_vertex)
-            if len(vs_out) == 0:
-                res = stack.copy()
-                stack.pop()
-                return [res]
-
-            res = []
-            for v_out in vs_out:
-                res.extend(await collect_subtrees(descendants_f, v_out, stack))
-
-            stack.pop()
-
-            return res
-
-        async with self.pg_engine.engine().acquire() as conn:
-            child_subtrees = list(
-                await collect_subtrees(
-                    partial(self._descendants, conn=conn),
-                    vertex,
-                )
+            if not frontier:
+                return
+
+            where, args = 'p.vertex = any(%s)', (frontier,)
+
+    async def migrate(self):
+        """Upgrade a ``graph`` table created before depths were kept: add
+        the ``depth`` column and the rows of leaf vertexes, then compute
+        every depth."""
+        async with self.pg_engine.acquire() as conn:
+            async with conn.begin():
+                await conn.execute('lock graph in SHARE ROW EXCLUSIVE mode')
+                await self._migrate(conn)
+
+        self.trees_cache.clear()
+
+    async def _migrate(self, conn):
+        await conn.execute(
+            '''ALTER TABLE graph ADD COLUMN IF NOT EXISTS
+                depth integer NOT NULL DEFAULT 0'''
+        )
+        await conn.execute(
+            '''CREATE INDEX IF NOT EXISTS graph_depth_idx
+                ON graph (depth, vertex)'''
+        )
+        await self._create_version(conn)
+
+        await conn.execute(
+            '''insert into graph (vertex, vertex_out)
+            select distinct v_out.vertex, '{}'::text[]
+            from graph g, unnest(g.vertex_out) as v_out(vertex)
+            on conflict(vertex) do nothing'''
+        )
+
+        await conn.execute('update graph set depth = 0')
+        await self._update_depths(None, conn)
+
+    # taken by deletes, concurrent writers are serialized by the version
+    _write_lock = 'lock graph in ROW EXCLUSIVE mode'
+
+    async def delete(self, edges):
+        edges = [
+            edge for edge in map(self._normalize_edge, edges)
+            if edge[1] is not None
+        ]
+
+        async with self.pg_engine.acquire() as conn:
+            async with conn.begin():
+                await conn.execute(self._write_lock)
+                version = await self._bump_version(conn)
+
+                await self._delete_edges(edges, conn)
+
+        self._invalidate(version, *{v for edge in edges for v in edge})
+        self._reachability = None
+
+        return version
+
+    async def delete_vertex(self, vertex):
+        async with self.pg_engine.acquire() as conn:
+            async with conn.begin():
+                await conn.execute(self._write_lock)
+                version = await self._bump_version(conn)
+
+                down = await self._adjacency([vertex], 'down', conn)
+                up = await self._adjacency([vertex], 'up', conn)
+                edges = [(vertex, v_to) for v_to in down[vertex]]
+                edges.extend((v_from, vertex) for v_from in up[vertex])
+
+                await self._delete_edges(edges, conn)
+                await self._delete_vertex_pg(vertex, conn)
+
+        self._invalidate(version, vertex)
+        self._reachability = None
+
+        return version
+
+    async def _delete_edges(self, edges, conn):
+        if not edges:
+            return
+
+        await conn.execute(
+            '''update graph g set vertex_out = array(
+                select v_out.vertex
+                from unnest(g.vertex_out) as v_out(vertex)
+                where not v_out.vertex = any(d.v_to)
             )
-            parent_subtrees = list(
-                await collect_subtrees(
-                    partial(self._ancestors, conn=conn),
-                    vertex,
-                )
+            from (
+                select e.v_from, array_agg(e.v_to) as v_to
+                from unnest(%s::text[], %s::text[]) as e(v_from, v_to)
+                group by e.v_from
+            ) d
+            where g.vertex = d.v_from and g.vertex_out && d.v_to''',
+            [v_from for v_from, _ in edges],
+            [v_to for _, v_to in edges],
+        )
+
+        await self._lower_depths({v_to for _, v_to in edges}, conn)
+
+    async def _delete_vertex_pg(self, vertex, conn):
+        await conn.execute('delete from graph where vertex = %s', vertex)
+
+    async def _lower_depths(self, targets, conn):
+        # vertexes below ``targets`` whose depth drops start over from 0
+        # and are raised layer by layer
+        rows = await conn.execute(
+            '''with recursive cone(vertex) as (
+                select g.vertex
+                from graph g
+                where g.vertex = any(%s) and g.depth > coalesce((
+                    select max(p.depth) + 1 from graph p
+                    where p.vertex_out @> array[g.vertex]
+                ), 0)
+              union
+                select v_out.vertex
+                from cone c
+                join graph g on g.vertex = c.vertex,
+                unnest(g.vertex_out) as v_out(vertex)
             )
+            update graph g set depth = 0
+            from cone c
+            where g.vertex = c.vertex
+            returning g.vertex''',
+            list(targets),
+        )
+        cone = [row.vertex for row in await rows.fetchall()]
 
-        result = []
-        for parent_subtree in parent_subtrees:
-            parent_subtree = list(reversed(parent_subtree))
-            parent_subtree.pop()
+        while cone:
+            rows = await conn.execute(
+                '''update graph c set depth = p.depth + 1
+                from graph p, unnest(p.vertex_out) as v_out(vertex)
+                where c.vertex = v_out.vertex
+                and c.vertex = any(%s)
+                and c.depth < p.depth + 1''',
+                cone,
+            )
+            if rows.rowcount == 0:
+                break
 
-            for child_subtree in child_subtrees:
-                result.append(parent_subtree + child_subtree)
+    def _traversal(self, conn) -> MemoizedTraversal:
+        return MemoizedTraversal(
+            self._adjacent_f('down', conn),
+            self._adjacent_f('up', conn),
+        )
+
+    _adjacency_batch = 1000
+
+    def _adjacent_f(self, direction, conn):
+        """Adjacency function fetching a whole frontier per query.
+
+        Neighbours returned so far are fetched together with the next
+        missing vertex (usually one of them), so a traversal costs one
+        round trip per level of the cone instead of one per vertex.
+        """
+        adjacency, pending = {}, set()
+
+        async def _adjacent(vertex):
+            if vertex not in adjacency:
+                pending.discard(vertex)
+
+                batch = [vertex]
+                while pending and len(batch) < self._adjacency_batch:
+                    batch.append(pending.pop())
+
+                fetched = await self._adjacency(batch, direction, conn)
+                adjacency.update(fetched)
+
+                for vs in fetched.values():
+                    pending.update(v for v in vs if v not in adjacency)
 
-        return result
+            return adjacency[vertex]
+
+        return _adjacent
+
+    async def trees(self, vertex):
+        async with self.pg_engine.acquire() as conn:
+            self._sync_caches(await self._version(conn))
+
+            return await self._trees(vertex, self._traversal(conn))
+
+    async def query(self, vertexes, operation):
+        async with self.pg_engine.acquire() as conn:
+            if operation == 'trees':
+                self._sync_caches(await self._version(conn))
+
+            traversal = self._traversal(conn)
+
+            for vertex in vertexes:
+                if await self._has_vertex(vertex, conn):
+                    yield vertex, await self._run(operation, vertex, traversal)
+                else:
+                    yield vertex, None
 
     async def _ancestors(self, vertex, conn=None):
-        rows = await conn.execute(
-            'select vertex from graph where vertex_out @> ARRAY[%s]', vertex
-        )
+        rows = await self.pg_engine.execute(conn, 'ancestors', vertex)
         res = set()
         async for row in rows:
             res.add(row.vertex)
@@ -211,12 +632,501 @@ class PgGinGraphModel(ABCGraphModel):
         return res
 
     async def _descendants(self, vertex, conn=None):
-        rows = await conn.execute(
-            'select vertex_out from graph where vertex = %s', vertex
-        )
+        rows = await self.pg_engine.execute(conn, 'descendants', vertex)
 
         if rows.rowcount == 0:
             return set()
 
         row = await rows.fetchone()
         return set(row.vertex_out)
+
+    async def adjacency(self, vertexes, direction) -> dict:
+        async with self.pg_engine.acquire() as conn:
+            return await self._adjacency(vertexes, direction, conn)
+
+    async def _adjacency(self, vertexes, direction, conn) -> dict:
+        adjacency = {v: set() for v in vertexes}
+
+        rows = await self.pg_engine.execute(
+            conn,
+            'adjacency_' + direction,
+            list(adjacency),
+        )
+
+        if direction == 'down':
+            async for row in rows:
+                adjacency[row.vertex].update(row.vertex_out)
+        else:
+            async for row in rows:
+                for v_out in row.vertex_out:
+                    if v_out in adjacency:
+                        adjacency[v_out].add(row.vertex)
+
+        return adjacency
+
+    _topo_batch = 1000
+
+    _cone_ctes = {
+        'down': """down(vertex) as (
+                select %(vertex)s::text
+              union
+                select v_out.vertex
+                from down d
+                join graph g on g.vertex = d.vertex,
+                unnest(g.vertex_out) as v_out(vertex)
+            )""",
+        'up': """up(vertex) as (
+                select %(vertex)s::text
+              union
+                select g.vertex
+                from up u
+                join graph g on g.vertex_out @> array[u.vertex]
+            )""",
+    }
+
+    async def topo(self, vertex=None, direction='both'):
+        async with self.pg_engine.acquire() as conn:
+            if vertex is None:
+                async for row in self._topo_all(conn):
+                    yield row
+                return
+
+            names = ('down', 'up') if direction == 'both' else (direction,)
+
+            rows = await conn.execute(
+                """with recursive {ctes}
+                select vertex, depth from graph
+                where vertex in ({cone})
+                order by depth, vertex
+                """.format(
+                    ctes=', '.join(self._cone_ctes[name] for name in names),
+                    cone=' union '.join(
+                        'select vertex from {}'.format(name) for name in names
+                    ),
+                ),
+                {'vertex': vertex},
+            )
+            async for row in rows:
+                yield row.vertex, row.depth
+
+    async def _topo_all(self, conn):
+        # keyset pagination over graph_depth_idx streams the whole graph
+        # in order without materializing it
+        last_depth, last_vertex = -1, ''
+
+        while True:
+            rows = await conn.execute(
+                """select vertex, depth from graph
+                where (depth, vertex) > (%s, %s)
+                order by depth, vertex
+                limit %s""",
+                last_depth,
+                last_vertex,
+                self._topo_batch,
+            )
+            rows = await rows.fetchall()
+
+            for row in rows:
+                yield row.vertex, row.depth
+
+            if len(rows) < self._topo_batch:
+                return
+
+            last_depth, last_vertex = rows[-1].depth, rows[-1].vertex
+
+    _hop_ctes = {
+        'down': """down(vertex, hops) as (
+                select %(vertex)s::text, 0
+              union
+                select v_out.vertex, d.hops + 1
+                from down d
+                join graph g on g.vertex = d.vertex,
+                unnest(g.vertex_out) as v_out(vertex)
+                where d.hops < %(down)s
+            )""",
+        'up': """up(vertex, hops) as (
+                select %(vertex)s::text, 0
+              union
+                select g.vertex, u.hops + 1
+                from up u
+                join graph g on g.vertex_out @> array[u.vertex]
+                where u.hops < %(up)s
+            )""",
+    }
+
+    async def subgraph(self, vertex, up=None, down=None):
+        async with self.pg_engine.acquire() as conn:
+            rows = await self._subgraph_rows(vertex, up, down, conn)
+            rows = await rows.fetchall()
+
+        if not rows:
+            return None
+
+        adjacency = {row.vertex: row.vertex_out for row in rows}
+        return induced(adjacency.__getitem__, adjacency)
+
+    async def _subgraph_rows(self, vertex, up, down, conn):
+        hops = {'down': down, 'up': up}
+
+        return await conn.execute(
+            """with recursive {ctes}
+            select vertex, vertex_out from graph
+            where vertex in (
+                select vertex from down union select vertex from up
+            )
+            """.format(
+                ctes=', '.join(
+                    (self._cone_ctes if hops[name] is None else
+                     self._hop_ctes)[name]
+                    for name in ('down', 'up')
+                ),
+            ),
+            {'vertex': vertex, 'down': down, 'up': up},
+        )
+
+    async def depth(self, vertex):
+        async with self.pg_engine.acquire() as conn:
+            rows = await self.pg_engine.execute(conn, 'depth', vertex)
+            row = await rows.fetchone()
+
+            return None if row is None else row.depth
+
+    async def warm(self):
+        await self.reachability([])
+
+    async def reachability(self, pairs) -> list:
+        loop = asyncio.get_event_loop()
+
+        if self._reachability is None:
+            # the snapshot is private, index it off the event loop
+            self._reachability = await loop.run_in_executor(
+                None,
+                ReachabilityIndex.from_graph,
+                await self.snapshot(),
+            )
+
+        reachable = await loop.run_in_executor(
+            None,
+            self._reachability.reaches,
+            pairs,
+        )
+
+        return reachable.tolist()
+
+    async def snapshot(self) -> AcyclicDiGraph:
+        async with self.pg_engine.acquire() as conn:
+            rows = await conn.execute('select vertex, vertex_out from graph')
+            rows = await rows.fetchall()
+
+        def edges():
+            for row in rows:
+                yield row.vertex, None
+
+                for v_out in row.vertex_out:
+                    yield row.vertex, v_out
+
+        return AcyclicDiGraph.from_edges(edges(), strict=False)
+
+
+class PgClosureGraphModel(PgGinGraphModel):
+    """``PgGinGraphModel`` keeping a transitive closure table.
+
+    ``graph_closure`` holds a row per ``(ancestor, descendant)`` pair with
+    the length of the shortest path between them, ``0`` for the row of
+    every vertex to itself. Inserting ``u -> v`` adds the cross product of
+    the ancestors of ``u`` and the descendants of ``v``, so cycle checks
+    and reachability become indexed lookups and a cone is read with one
+    query.
+    """
+
+    def __init__(self, pg_engine: PgEngine, trees_cache: ConeCache = None):
+        super().__init__(pg_engine, trees_cache=trees_cache)
+
+        self.closure_edges = 0
+        self.closure_rows_written = 0
+
+    async def init(self):
+        await super().init()
+
+        async with self.pg_engine.acquire() as conn:
+            await conn.execute('DROP TABLE IF EXISTS graph_closure')
+            await self._create_closure(conn)
+
+    async def _create_closure(self, conn):
+        await conn.execute(
+            '''CREATE TABLE IF NOT EXISTS graph_closure (
+                    ancestor text NOT NULL,
+                    descendant text NOT NULL,
+                    depth integer NOT NULL,
+                    PRIMARY KEY (ancestor, descendant)
+            )'''
+        )
+        await conn.execute(
+            '''CREATE INDEX IF NOT EXISTS graph_closure_descendant_idx
+                ON graph_closure (descendant, ancestor)'''
+        )
+
+    async def _insert_one(self, v_from, v_to, checked_version=None):
+        return await self._insert_many(
+            [(v_from, v_to)],
+            checked_version=checked_version,
+        )
+
+    async def _insert_many(self, edges, checked_version=None):
+        async with self.pg_engine.acquire() as conn:
+            async with conn.begin():
+                # closure maintenance is not commutative with a concurrent
+                # writer, serialize them
+                await conn.execute(
+                    'lock graph_closure in SHARE ROW EXCLUSIVE mode'
+                )
+                version = await self._bump_version(conn)
+                checked = version - 1 == checked_version
+
+                for v_from, v_to in edges:
+                    if v_to is None or checked:
+                        pass
+                    elif await self._reaches(v_to, v_from, conn):
+                        raise InconsistentState(
+                            'Cycle for {} -> {}'.format(v_from, v_to),
+                        )
+
+                    await self._insert_one_pg(v_from, v_to, conn)
+                    await self._insert_closure(v_from, v_to, conn)
+
+                await self._update_depths(
+                    {v_from for v_from, v_to in edges if v_to is not None},
+                    conn,
+                )
+
+        vertexes = {v for edge in edges for v in edge if v is not None}
+        self._invalidate(version, *vertexes)
+
+        return version
+
+    async def _reaches(self, v_from, v_to, conn):
+        if v_from == v_to:
+            return True
+
+        rows = await self.pg_engine.execute(
+            conn, 'closure_reaches', v_from, v_to,
+        )
+        return rows.rowcount > 0
+
+    async def _insert_closure(self, v_from, v_to, conn):
+        rows = await conn.execute(
+            '''insert into graph_closure (ancestor, descendant, depth)
+            select v.vertex, v.vertex, 0
+            from unnest(%s::text[]) as v(vertex)
+            on conflict (ancestor, descendant) do nothing''',
+            [v for v in (v_from, v_to) if v is not None],
+        )
+        written = rows.rowcount
+
+        if v_to is not None:
+            rows = await conn.execute(
+                '''insert into graph_closure (ancestor, descendant, depth)
+                select a.ancestor, d.descendant, a.depth + d.depth + 1
+                from graph_closure a, graph_closure d
+                where a.descendant = %s and d.ancestor = %s
+                on conflict (ancestor, descendant) do
+                update set depth = excluded.depth
+                where excluded.depth < graph_closure.depth''',
+                v_from,
+                v_to,
+            )
+            written += rows.rowcount
+
+            self.closure_edges += 1
+
+        self.closure_rows_written += written
+
+    _write_lock = 'lock graph_closure in SHARE ROW EXCLUSIVE mode'
+
+    async def _delete_edges(self, edges, conn):
+        if not edges:
+            return
+
+        await super()._delete_edges(edges, conn)
+
+        # drop the pairs a deleted edge may have connected, then derive
+        # those still connected again, deepest ancestors first
+        rows = await conn.execute(
+            '''delete from graph_closure c
+            using (
+                select a.ancestor, d.descendant
+                from unnest(%s::text[], %s::text[]) as e(v_from, v_to)
+                join graph_closure a on a.descendant = e.v_from
+                join graph_closure d on d.ancestor = e.v_to
+            ) s
+            where c.ancestor = s.ancestor and c.descendant = s.descendant
+            returning c.ancestor''',
+            [v_from for v_from, _ in edges],
+            [v_to for _, v_to in edges],
+        )
+        ancestors = {row.ancestor for row in await rows.fetchall()}
+
+        rows = await conn.execute(
+            'select vertex, depth from graph where vertex = any(%s)',
+            list(ancestors),
+        )
+        layers = {}
+        for row in await rows.fetchall():
+            layers.setdefault(row.depth, []).append(row.vertex)
+
+        for depth in sorted(layers, reverse=True):
+            rows = await conn.execute(
+                '''insert into graph_closure (ancestor, descendant, depth)
+                select g.vertex, c.descendant, min(c.depth) + 1
+                from graph g
+                cross join lateral unnest(g.vertex_out) as v_out(vertex)
+                join graph_closure c on c.ancestor = v_out.vertex
+                where g.vertex = any(%s)
+                group by g.vertex, c.descendant
+                on conflict (ancestor, descendant) do nothing''',
+                layers[depth],
+            )
+            self.closure_rows_written += rows.rowcount
+
+    async def _delete_vertex_pg(self, vertex, conn):
+        await super()._delete_vertex_pg(vertex, conn)
+
+        await conn.execute(
+            '''delete from graph_closure
+            where ancestor = %s or descendant = %s''',
+            vertex,
+            vertex,
+        )
+
+    def _traversal(self, conn) -> MemoizedTraversal:
+        down, up = {}, {}
+
+        async def _descendants(vertex):
+            if vertex not in down:
+                await self._load_cone(vertex, down, up, conn)
+            return down.get(vertex, set())
+
+        async def _ancestors(vertex):
+            if vertex not in up:
+                await self._load_cone(vertex, down, up, conn)
+            return up.get(vertex, set())
+
+        return MemoizedTraversal(_descendants, _ancestors)
+
+    async def _load_cone(self, vertex, down, up, conn):
+        """Fetch the adjacency of both cones of ``vertex`` at once."""
+        rows = await conn.execute(
+            '''select g.vertex, g.vertex_out
+            from graph_closure c
+            join graph g on g.vertex = c.descendant
+            where c.ancestor = %s''',
+            vertex,
+        )
+        async for row in rows:
+            down[row.vertex] = set(row.vertex_out)
+
+        rows = await conn.execute(
+            '''select g.vertex, g.vertex_out
+            from graph_closure c
+            join graph g on g.vertex = c.ancestor
+            where c.descendant = %s''',
+            vertex,
+        )
+        rows = await rows.fetchall()
+
+        # every parent of an ancestor is an ancestor too
+        ancestors = {row.vertex for row in rows}
+        for ancestor in ancestors:
+            up.setdefault(ancestor, set())
+        for row in rows:
+            for v_out in row.vertex_out:
+                if v_out in ancestors:
+                    up[v_out].add(row.vertex)
+
+        down.setdefault(vertex, set())
+        up.setdefault(vertex, set())
+
+    async def _subgraph_rows(self, vertex, up, down, conn):
+        return await conn.execute(
+            """select vertex, vertex_out from graph
+            where vertex in (
+                select descendant from graph_closure
+                where ancestor = %(vertex)s
+                and (%(down)s::int is null or depth <= %(down)s)
+              union
+                select ancestor from graph_closure
+                where descendant = %(vertex)s
+                and (%(up)s::int is null or depth <= %(up)s)
+            )""",
+            {'vertex': vertex, 'down': down, 'up': up},
+        )
+
+    async def reachability(self, pairs) -> list:
+        async with self.pg_engine.acquire() as conn:
+            rows = await conn.execute(
+                '''select exists(
+                    select 1 from graph_closure c
+                    where c.ancestor = p.v_from and c.descendant = p.v_to
+                ) as reachable
+                from unnest(%s::text[], %s::text[])
+                with ordinality as p(v_from, v_to, i)
+                order by p.i''',
+                [v_from for v_from, _ in pairs],
+                [v_to for _, v_to in pairs],
+            )
+
+            return [row.reachable for row in await rows.fetchall()]
+
+    async def rebuild_closure(self):
+        """(Re)build the closure of an existing ``graph`` table.
+
+        Tables created before the closure (or depth) existed are upgraded
+        in place like :meth:`migrate` first, then the closure is built
+        layer by layer from the deepest one, each layer with a single
+        set-based insert.
+        """
+        async with self.pg_engine.acquire() as conn:
+            async with conn.begin():
+                await conn.execute('lock graph in SHARE ROW EXCLUSIVE mode')
+
+                await self._migrate(conn)
+                await self._create_closure(conn)
+                await conn.execute(
+                    'lock graph_closure in ACCESS EXCLUSIVE mode'
+                )
+
+                await conn.execute('delete from graph_closure')
+                await conn.execute(
+                    '''insert into graph_closure (ancestor, descendant, depth)
+                    select vertex, vertex, 0 from graph'''
+                )
+
+                rows = await conn.execute(
+                    'select coalesce(max(depth), 0) as depth from graph'
+                )
+                max_depth = (await rows.fetchone()).depth
+
+                for depth in range(max_depth - 1, -1, -1):
+                    await conn.execute(
+                        '''insert into graph_closure
+                            (ancestor, descendant, depth)
+                        select g.vertex, c.descendant, min(c.depth) + 1
+                        from graph g
+                        cross join lateral
+                            unnest(g.vertex_out) as v_out(vertex)
+                        join graph_closure c on c.ancestor = v_out.vertex
+                        where g.depth = %s
+                        group by g.vertex, c.descendant''',
+                        depth,
+                    )
+
+        self.trees_cache.clear()
+
+    async def metrics(self) -> dict:
+        metrics = await super().metrics()
+        metrics['closure'] = {
+            'edges': self.closure_edges,
+            'rows_written': self.closure_rows_written,
+        }
+
+        return metrics
@@ -0,0 +1,585 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import ABCGraphModel
+from ....lib.cache import ConeCache
+from ....lib.graph import AcyclicDiGraph, InconsistentState
+from ....lib.reachability import ReachabilityIndex
+from ....lib.subgraph import induced
+from ....lib.traversal import MemoizedTraversal
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vertexes (
+    vertex text PRIMARY KEY,
+    depth integer NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS vertexes_depth_idx ON vertexes (depth, vertex);
+CREATE TABLE IF NOT EXISTS edges (
+    v_from text NOT NULL,
+    v_to text NOT NULL,
+    PRIMARY KEY (v_from, v_to)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_v_to_idx ON edges (v_to, v_from);
+CREATE TABLE IF NOT EXISTS meta (
+    key text PRIMARY KEY,
+    value integer NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+'''
+
+CONE_CTES = {
+    'down': '''down(vertex) AS (
+        SELECT :vertex
+      UNION
+        SELECT e.v_to FROM down d JOIN edges e ON e.v_from = d.vertex
+    )''',
+    'up': '''up(vertex) AS (
+        SELECT :vertex
+      UNION
+        SELECT e.v_from FROM up u JOIN edges e ON e.v_to = u.vertex
+    )''',
+}
+
+
+HOP_CTES = {
+    'down': '''down(vertex, hops) AS (
+        SELECT :vertex, 0
+      UNION
+        SELECT e.v_to, d.hops + 1
+        FROM down d JOIN edges e ON e.v_from = d.vertex
+        WHERE d.hops < :down
+    )''',
+    'up': '''up(vertex, hops) AS (
+        SELECT :vertex, 0
+      UNION
+        SELECT e.v_from, u.hops + 1
+        FROM up u JOIN edges e ON e.v_to = u.vertex
+        WHERE u.hops < :up
+    )''',
+}
+
+
+class SqliteEngine:
+    """Single SQLite connection driven from a dedicated thread.
+
+    Every call goes through :meth:`run`, so blocking SQLite work never
+    runs on the event loop and the connection is only ever touched by
+    one thread.
+    """
+
+    def __init__(self, config, loop):
+        self.config = config['sqlite']
+        self.loop = loop
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def init_engine(self):
+        self._conn = await self.loop.run_in_executor(
+            self._executor,
+            self._connect,
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.config['path'],
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.executescript(SCHEMA)
+
+        return conn
+
+    async def run(self, f, *args):
+        return await self.loop.run_in_executor(
+            self._executor,
+            partial(f, self._conn, *args),
+        )
+
+    async def close(self):
+        if self._conn:
+            await self.loop.run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+
+        self._executor.shutdown()
+
+
+class SqliteGraphModel(ABCGraphModel):
+
+    _cast = str
+
+    _topo_batch = 1000
+
+    # stays below SQLITE_MAX_VARIABLE_NUMBER of old builds
+    _in_batch = 900
+
+    def __init__(
+        self,
+        sqlite_engine: SqliteEngine,
+        trees_cache: ConeCache = None,
+    ):
+        self.sqlite_engine = sqlite_engine
+        self.trees_cache = ConeCache() if trees_cache is None else trees_cache
+        self._reachability = None
+
+    async def init(self):
+        def _init(conn):
+            conn.executescript(
+                '''DROP TABLE IF EXISTS edges;
+                DROP TABLE IF EXISTS vertexes;
+                DROP TABLE IF EXISTS meta;'''
+            )
+            conn.executescript(SCHEMA)
+
+        await self.sqlite_engine.run(_init)
+
+    async def has_vertex(self, vertex):
+        return await self.sqlite_engine.run(self._has_vertex, vertex)
+
+    @staticmethod
+    def _has_vertex(conn, vertex):
+        return conn.execute(
+            'SELECT 1 FROM vertexes WHERE vertex = ?', (vertex,),
+        ).fetchone() is not None
+
+    async def vertexes(self):
+        def _vertexes(conn):
+            return [
+                row[0] for row in conn.execute('SELECT vertex FROM vertexes')
+            ]
+
+        return await self.sqlite_engine.run(_vertexes)
+
+    async def insert(self, edges, checked_version=None):
+        edges = list(map(self._normalize_edge, edges))
+
+        if not edges:
+            return await self.version()
+
+        version = await self.sqlite_engine.run(
+            self._insert, edges, checked_version,
+        )
+
+        self._invalidate(
+            version, *{v for edge in edges for v in edge if v is not None}
+        )
+        self._reachability = None
+
+        return version
+
+    async def version(self) -> int:
+        return await self.sqlite_engine.run(self._version)
+
+    @staticmethod
+    def _version(conn):
+        return conn.execute(
+            "SELECT value FROM meta WHERE key = 'version'"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _insert(conn, edges, checked_version=None):
+        new_edges = [edge for edge in edges if edge[1] is not None]
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+            )
+            version = SqliteGraphModel._version(conn)
+
+            conn.executemany(
+                'INSERT OR IGNORE INTO vertexes (vertex) VALUES (?)',
+                {(v,) for edge in edges for v in edge if v is not None},
+            )
+
+            conn.execute(
+                '''CREATE TEMP TABLE IF NOT EXISTS batch (
+                    v_from text, v_to text
+                )'''
+            )
+            conn.execute('DELETE FROM batch')
+            conn.executemany('INSERT INTO batch VALUES (?, ?)', new_edges)
+            conn.execute(
+                'INSERT OR IGNORE INTO edges SELECT v_from, v_to FROM batch'
+            )
+
+            if version - 1 != checked_version:
+                # a new cycle has to go through one of the new edges
+                cycle = conn.execute(
+                    '''WITH RECURSIVE reach(origin, vertex) AS (
+                        SELECT v_from, v_to FROM batch
+                      UNION
+                        SELECT r.origin, e.v_to
+                        FROM reach r JOIN edges e ON e.v_from = r.vertex
+                    )
+                    SELECT origin FROM reach WHERE origin = vertex LIMIT 1'''
+                ).fetchone()
+                if cycle is not None:
+                    raise InconsistentState('Cycle for {}'.format(cycle[0]))
+
+            SqliteGraphModel._update_depths(conn)
+
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        return version
+
+    @staticmethod
+    def _update_depths(conn):
+        # push the longest-path layer down from the new edges, stopping
+        # at vertexes whose depth does not grow
+        rows = conn.execute(
+            '''WITH RECURSIVE bump(vertex, depth) AS (
+                SELECT e.v_to, v.depth + 1
+                FROM batch b
+                JOIN vertexes v ON v.vertex = b.v_from
+                JOIN edges e ON e.v_from = b.v_from
+              UNION ALL
+                SELECT e.v_to, b.depth + 1
+                FROM bump b
+                JOIN vertexes v ON v.vertex = b.vertex AND v.depth < b.depth
+                JOIN edges e ON e.v_from = b.vertex
+            )
+            SELECT vertex, max(depth) FROM bump GROUP BY vertex'''
+        ).fetchall()
+
+        conn.executemany(
+            '''UPDATE vertexes SET depth = ?
+            WHERE vertex = ? AND depth < ?''',
+            [(depth, vertex, depth) for vertex, depth in rows],
+        )
+
+    async def adjacency(self, vertexes, direction) -> dict:
+        return await self.sqlite_engine.run(
+            self._adjacency, list(vertexes), direction,
+        )
+
+    async def delete(self, edges):
+        edges = [
+            edge for edge in map(self._normalize_edge, edges)
+            if edge[1] is not None
+        ]
+
+        return await self._delete(edges)
+
+    async def delete_vertex(self, vertex):
+        return await self._delete([], vertex)
+
+    async def _delete(self, edges, vertex=None):
+        version, edges = await self.sqlite_engine.run(
+            self._delete_edges, edges, vertex,
+        )
+
+        vertexes = {v for edge in edges for v in edge}
+        if vertex is not None:
+            vertexes.add(vertex)
+
+        self._invalidate(version, *vertexes)
+        self._reachability = None
+
+        return version
+
+    @staticmethod
+    def _delete_edges(conn, edges, vertex=None):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+            )
+            version = SqliteGraphModel._version(conn)
+
+            if vertex is not None:
+                edges = edges + conn.execute(
+                    '''SELECT v_from, v_to FROM edges
+                    WHERE v_from = ? OR v_to = ?''',
+                    (vertex, vertex),
+                ).fetchall()
+
+            conn.execute(
+                '''CREATE TEMP TABLE IF NOT EXISTS batch (
+                    v_from text, v_to text
+                )'''
+            )
+            conn.execute('DELETE FROM batch')
+            conn.executemany('INSERT INTO batch VALUES (?, ?)', edges)
+            conn.execute(
+                '''DELETE FROM edges WHERE EXISTS (
+                    SELECT 1 FROM batch b
+                    WHERE b.v_from = edges.v_from AND b.v_to = edges.v_to
+                )'''
+            )
+
+            if vertex is not None:
+                conn.execute(
+                    'DELETE FROM vertexes WHERE vertex = ?', (vertex,),
+                )
+
+            SqliteGraphModel._lower_depths(conn)
+
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        return version, edges
+
+    @staticmethod
+    def _lower_depths(conn):
+        # vertexes below the deleted edges whose depth drops start over
+        # from 0 and are raised layer by layer
+        conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS cone (vertex text PRIMARY KEY)'
+        )
+        conn.execute('DELETE FROM cone')
+        conn.execute(
+            '''INSERT INTO cone WITH RECURSIVE c(vertex) AS (
+                SELECT v.vertex
+                FROM batch b JOIN vertexes v ON v.vertex = b.v_to
+                WHERE v.depth > coalesce((
+                    SELECT max(p.depth) + 1
+                    FROM edges e JOIN vertexes p ON p.vertex = e.v_from
+                    WHERE e.v_to = v.vertex
+                ), 0)
+              UNION
+                SELECT e.v_to FROM c JOIN edges e ON e.v_from = c.vertex
+            )
+            SELECT vertex FROM c'''
+        )
+        conn.execute('UPDATE vertexes SET depth = 0 WHERE vertex IN cone')
+
+        while conn.execute(
+            '''UPDATE vertexes SET depth = (
+                SELECT max(p.depth) + 1
+                FROM edges e JOIN vertexes p ON p.vertex = e.v_from
+                WHERE e.v_to = vertexes.vertex
+            )
+            WHERE vertex IN cone AND depth < (
+                SELECT max(p.depth) + 1
+                FROM edges e JOIN vertexes p ON p.vertex = e.v_from
+                WHERE e.v_to = vertexes.vertex
+            )'''
+        ).rowcount:
+            pass
+
+    def _adjacency(self, conn, vertexes, direction):
+        if direction == 'down':
+            key, value = 'v_from', 'v_to'
+        else:
+            key, value = 'v_to', 'v_from'
+
+        adjacency = {v: set() for v in vertexes}
+
+        for i in range(0, len(vertexes), self._in_batch):
+            batch = vertexes[i:i + self._in_batch]
+
+            rows = conn.execute(
+                'SELECT {key}, {value} FROM edges WHERE {key} IN ({in_})'
+                .format(key=key, value=value, in_=', '.join('?' * len(batch))),
+                batch,
+            )
+            for v, v_adjacent in rows:
+                adjacency[v].add(v_adjacent)
+
+        return adjacency
+
+    def _traversal(self) -> MemoizedTraversal:
+        adjacency = {'down': {}, 'up': {}}
+
+        def adjacent_f(direction):
+            async def _adjacent(vertex):
+                vs = adjacency[direction]
+
+                if vertex not in vs:
+                    vs.update(
+                        await self.sqlite_engine.run(
+                            self._cone_adjacency, vertex, direction,
+                        )
+                    )
+
+                return vs.get(vertex, set())
+
+            return _adjacent
+
+        return MemoizedTraversal(adjacent_f('down'), adjacent_f('up'))
+
+    @staticmethod
+    def _cone_adjacency(conn, vertex, direction) -> dict:
+        """Adjacency of the whole ``direction`` cone of ``vertex``."""
+        if direction == 'down':
+            join, key, value = 'e.v_from = c.vertex', 'v_from', 'v_to'
+        else:
+            join, key, value = 'e.v_to = c.vertex', 'v_to', 'v_from'
+
+        rows = conn.execute(
+            '''WITH RECURSIVE {cte}
+            SELECT c.vertex, e.{key}, e.{value}
+            FROM {name} c LEFT JOIN edges e ON {join}'''.format(
+                cte=CONE_CTES[direction],
+                name=direction,
+                key=key,
+                value=value,
+                join=join,
+            ),
+            {'vertex': vertex},
+        )
+
+        adjacency = {}
+        for v, _, v_adjacent in rows:
+            vs = adjacency.setdefault(v, set())
+            if v_adjacent is not None:
+                vs.add(v_adjacent)
+
+        return adjacency
+
+    async def trees(self, vertex):
+        self._sync_caches(await self.version())
+
+        return await self._trees(vertex, self._traversal())
+
+    async def query(self, vertexes, operation):
+        if operation == 'trees':
+            self._sync_caches(await self.version())
+
+        traversal = self._traversal()
+
+        for vertex in vertexes:
+            if await self.has_vertex(vertex):
+                yield vertex, await self._run(operation, vertex, traversal)
+            else:
+                yield vertex, None
+
+    async def topo(self, vertex=None, direction='both'):
+        if vertex is None:
+            last = (-1, '')
+
+            while True:
+                rows = await self.sqlite_engine.run(self._topo_page, last)
+
+                for row in rows:
+                    yield row
+
+                if len(rows) < self._topo_batch:
+                    return
+
+                last = rows[-1][::-1]
+        else:
+            for row in await self.sqlite_engine.run(
+                self._topo_cone, vertex, direction,
+            ):
+                yield row
+
+    def _topo_page(self, conn, last):
+        return conn.execute(
+            '''SELECT vertex, depth FROM vertexes
+            WHERE (depth, vertex) > (?, ?)
+            ORDER BY depth, vertex
+            LIMIT ?''',
+            last + (self._topo_batch,),
+        ).fetchall()
+
+    @staticmethod
+    def _topo_cone(conn, vertex, direction):
+        names = ('down', 'up') if direction == 'both' else (direction,)
+
+        return conn.execute(
+            '''WITH RECURSIVE {ctes}
+            SELECT vertex, depth FROM vertexes
+            WHERE vertex IN ({cone})
+            ORDER BY depth, vertex'''.format(
+                ctes=', '.join(CONE_CTES[name] for name in names),
+                cone=' UNION '.join(
+                    'SELECT vertex FROM {}'.format(name) for name in names
+                ),
+            ),
+            {'vertex': vertex},
+        ).fetchall()
+
+    async def subgraph(self, vertex, up=None, down=None):
+        adjacency = await self.sqlite_engine.run(
+            self._subgraph_adjacency, vertex, up, down,
+        )
+
+        if not adjacency:
+            return None
+
+        return induced(adjacency.__getitem__, adjacency)
+
+    @staticmethod
+    def _subgraph_adjacency(conn, vertex, up, down) -> dict:
+        hops = {'down': down, 'up': up}
+
+        rows = conn.execute(
+            '''WITH RECURSIVE {ctes}, cone(vertex) AS (
+                SELECT vertex FROM down UNION SELECT vertex FROM up
+            )
+            SELECT v.vertex, e.v_to
+            FROM cone c
+            JOIN vertexes v ON v.vertex = c.vertex
+            LEFT JOIN edges e
+                ON e.v_from = c.vertex AND e.v_to IN (SELECT vertex FROM cone)
+            '''.format(
+                ctes=', '.join(
+                    (CONE_CTES if hops[name] is None else HOP_CTES)[name]
+                    for name in ('down', 'up')
+                ),
+            ),
+            {'vertex': vertex, 'down': down, 'up': up},
+        )
+
+        adjacency = {}
+        for v, v_to in rows:
+            vs = adjacency.setdefault(v, set())
+            if v_to is not None:
+                vs.add(v_to)
+
+        return adjacency
+
+    async def depth(self, vertex):
+        def _depth(conn):
+            row = conn.execute(
+                'SELECT depth FROM vertexes WHERE vertex = ?', (vertex,),
+            ).fetchone()
+
+            return None if row is None else row[0]
+
+        return await self.sqlite_engine.run(_depth)
+
+    async def warm(self):
+        await self.reachability([])
+
+    async def reachability(self, pairs) -> list:
+        loop = asyncio.get_event_loop()
+
+        if self._reachability is None:
+            # the snapshot is private, index it off the event loop
+            self._reachability = await loop.run_in_executor(
+                None,
+                ReachabilityIndex.from_graph,
+                await self.snapshot(),
+            )
+
+        reachable = await loop.run_in_executor(
+            None,
+            self._reachability.reaches,
+            pairs,
+        )
+
+        return reachable.tolist()
+
+    async def snapshot(self) -> AcyclicDiGraph:
+        def _edges(conn):
+            return conn.execute(
+                '''SELECT vertex, NULL FROM vertexes
+                UNION ALL
+                SELECT v_from, v_to FROM edges'''
+            ).fetchall()
+
+        return AcyclicDiGraph.from_edges(
+            await self.sqlite_engine.run(_edges),
+            strict=False,
+        )
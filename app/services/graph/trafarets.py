@@ -1,5 +1,7 @@
 import trafaret as t
 
+from ...lib.traversal import MemoizedTraversal
+
 NodesTrafaret = t.Dict(
     {
         t.Key('id', to_name='node_id'): t.String,
@@ -11,3 +13,50 @@ NodesTrafaret = t.Dict(
 NodesTrafaret = t.Dict(
     nodes=t.List(NodesTrafaret)
 )
+
+
+EdgesTrafaret = t.Dict(
+    edges=t.List(t.Dict(
+        {
+            t.Key('id', to_name='node_id'): t.String,
+            t.Key('parent'): t.String,
+        }
+    ))
+)
+
+
+NodesQueryTrafaret = t.Dict(
+    nodes=t.List(t.String),
+    operation=t.Enum(*MemoizedTraversal.operations),
+)
+
+
+TopoQueryTrafaret = t.Dict(
+    {
+        t.Key('vertex', optional=True): t.String,
+        t.Key('direction', default='both'): t.Enum(
+            *MemoizedTraversal.directions
+        ),
+    }
+)
+
+
+SubgraphQueryTrafaret = t.Dict(
+    {
+        t.Key('up', optional=True): t.Regexp(r'^[0-9]+$') >> int,
+        t.Key('down', optional=True): t.Regexp(r'^[0-9]+$') >> int,
+        t.Key('format', default='ndjson'): t.Enum('ndjson', 'csr'),
+    }
+)
+
+
+ReachabilityTrafaret = t.Dict(
+    pairs=t.List(t.Tuple(t.String, t.String)),
+)
+
+
+MemoryQueryTrafaret = t.Dict(
+    {
+        t.Key('tracemalloc', optional=True): t.Enum('diff', 'stop'),
+    }
+)
@@ -0,0 +1,71 @@
+"""Bytes per edge of the in-process graph representations.
+
+    python -m benchmark.memory --vertexes 100000 --edges 500000
+
+``sizeof`` figures are deep ``sys.getsizeof`` estimates (see
+``GET /debug/memory``), ``traced`` is what ``tracemalloc`` saw allocated
+while building the graph, as a cross-check.
+"""
+import argparse
+import io
+import tracemalloc
+
+from app.lib import snapshot
+from app.lib.cache import LRUCache
+from app.lib.graph import DiGraph
+from app.lib.memory import graph_memory, sizeof
+from app.lib.reachability import ReachabilityIndex
+from app.lib.topo import TopologicalLayers
+
+from .models import random_dag
+
+
+def main(args):
+    # vertexes are parsed per edge like from request JSON, so equal ones
+    # are separate objects held by ``edges`` / ``inv_edges`` as well
+    tracemalloc.start()
+    graph = DiGraph.from_edges(
+        (edge['parent'], edge['node_id'])
+        for edge in random_dag(args.vertexes, args.edges)
+    )
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = graph_memory(graph)
+    exclude = {id(v) for v in graph.vertexes()}
+    exclude.add(id(graph))
+
+    sizes = dict(report['bytes'])
+    sizes['digraph (traced)'] = traced
+
+    layers = TopologicalLayers(graph)
+    sizes['layers'] = sizeof(layers, exclude)
+    sizes['reachability'] = sizeof(
+        ReachabilityIndex.from_graph(graph, layers),
+        exclude,
+    )
+
+    cache = LRUCache(maxsize=len(graph))
+    for vertex in graph.vertexes():
+        cache.put(vertex, frozenset(graph.vertexes_to(vertex)))
+    sizes['adjacency_cache'] = sizeof(cache, exclude)
+
+    f = io.StringIO()
+    snapshot.dump(graph, f)
+    sizes['snapshot (ndjson)'] = len(f.getvalue().encode())
+
+    print('{} vertexes, {} edges'.format(report['vertexes'], report['edges']))
+    for name, size in sizes.items():
+        print('{:<20} {:>12} bytes {:>8.1f} bytes/edge'.format(
+            name,
+            size,
+            size / max(1, report['edges']),
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vertexes', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=500000)
+
+    main(parser.parse_args())
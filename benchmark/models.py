@@ -0,0 +1,108 @@
+"""Insert/trees throughput of the graph models, bypassing HTTP.
+
+    python -m benchmark.models --edges 50000 --batch 100
+    python -m benchmark.models --postgres  # also pg models, drops tables
+
+The pg closure model also reports write amplification: closure rows
+written per inserted edge.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import yaml
+
+from app.services.graph.resource import mem, pg, sqlite
+
+CONFIG_PATH = os.path.join('config', 'services', 'graph', 'config.yml')
+
+
+def random_dag(vertexes, edges, seed=0):
+    rnd = random.Random(seed)
+
+    for _ in range(edges):
+        v_from, v_to = sorted(rnd.sample(range(vertexes), 2))
+        yield {'parent': str(v_from), 'node_id': str(v_to)}
+
+
+async def bench_insert(model, edges, batch):
+    started = time.perf_counter()
+
+    for i in range(0, len(edges), batch):
+        await model.insert(edges[i:i + batch])
+
+    return time.perf_counter() - started
+
+
+async def bench_trees(model, vertexes):
+    started = time.perf_counter()
+
+    for vertex in vertexes:
+        await model.trees(vertex)
+
+    return time.perf_counter() - started
+
+
+async def models(args):
+    yield 'mem', mem.InMemoryGraphModel()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = sqlite.SqliteEngine(
+            {'sqlite': {'path': os.path.join(tmp, 'graph.sqlite3')}},
+            asyncio.get_event_loop(),
+        )
+        await engine.init_engine()
+
+        yield 'sqlite', sqlite.SqliteGraphModel(engine)
+
+        await engine.close()
+
+    if args.postgres:
+        engine = pg.PgEngine(
+            yaml.load(open(CONFIG_PATH)),
+            asyncio.get_event_loop(),
+        )
+        await engine.init_engine()
+
+        yield 'pg', pg.PgGinGraphModel(engine)
+        yield 'pg_closure', pg.PgClosureGraphModel(engine)
+
+        await engine.close()
+
+
+async def main(args):
+    edges = list(random_dag(args.vertexes, args.edges))
+    sample = [edge['node_id'] for edge in edges[:args.trees]]
+
+    async for name, model in models(args):
+        await model.init()
+
+        elapsed = await bench_insert(model, edges, args.batch)
+        print('{:<12} insert {:>10.0f} edges/s'.format(
+            name, len(edges) / elapsed,
+        ))
+
+        elapsed = await bench_trees(model, sample)
+        print('{:<12} trees  {:>10.0f} calls/s'.format(
+            name, len(sample) / elapsed,
+        ))
+
+        closure = (await model.metrics()).get('closure')
+        if closure and closure['edges']:
+            print('{:<12} closure rows/edge {:>6.1f}'.format(
+                name, closure['rows_written'] / closure['edges'],
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vertexes', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--trees', type=int, default=1000)
+    parser.add_argument('--postgres', action='store_true')
+
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""Startup time of ``python service.py graph``.
+
+    python -m benchmark.startup --edges 200000
+    python -m benchmark.startup --db sqlite
+
+Reports the time until the socket accepts connections and until
+``/ready`` answers ``200``; in mem mode the service warms up from a
+generated snapshot of ``--edges`` edges.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import yaml
+
+from app.lib import snapshot
+from app.lib.graph import DiGraph
+
+from .models import CONFIG_PATH, random_dag
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def listening(port):
+    try:
+        socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+    except OSError:
+        return False
+
+    return True
+
+
+def ready(port):
+    try:
+        urllib.request.urlopen(
+            'http://127.0.0.1:{}/ready'.format(port),
+            timeout=1,
+        ).close()
+    except (urllib.error.URLError, OSError):
+        return False
+
+    return True
+
+
+def start(config_path, port, timeout):
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'service.py', 'graph'],
+        env=dict(os.environ, SERVICE_CONFIG=config_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    bound = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise SystemExit('service exited with {}'.format(
+                    process.returncode,
+                ))
+
+            if bound is None and listening(port):
+                bound = time.perf_counter() - started
+
+            if bound is not None and ready(port):
+                return bound, time.perf_counter() - started
+
+            time.sleep(0.01)
+
+        raise SystemExit('service not ready in {}s'.format(timeout))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(args):
+    config = yaml.safe_load(open(CONFIG_PATH))
+    config['db'] = args.db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db == 'mem' and args.edges:
+            path = os.path.join(tmp, 'graph.ndjson')
+            with open(path, 'w') as f:
+                snapshot.dump(
+                    DiGraph.from_edges(
+                        (edge['parent'], edge['node_id'])
+                        for edge in random_dag(args.vertexes, args.edges)
+                    ),
+                    f,
+                )
+            config['mem']['snapshot'] = path
+
+        if args.db == 'sqlite':
+            config['sqlite']['path'] = os.path.join(tmp, 'graph.sqlite3')
+
+        for _ in range(args.runs):
+            config['api']['port'] = port = free_port()
+
+            config_path = os.path.join(tmp, 'config.yml')
+            with open(config_path, 'w') as f:
+                yaml.safe_dump(config, f)
+
+            bound, warm = start(config_path, port, args.timeout)
+            print('{:<8} listening {:>8.3f}s ready {:>8.3f}s'.format(
+                args.db, bound, warm,
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default='mem')
+    parser.add_argument('--vertexes', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=50000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120)
+
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+"""Cycle check time of one large union batch, serial vs by component.
+
+    python -m benchmark.validation --components 64 --edges 500000
+
+The batch is ``--components`` disjoint random DAGs attached to an
+existing graph of ``--graph-edges`` edges.
+"""
+import argparse
+import random
+import time
+
+from app.lib.components import ComponentValidator
+from app.lib.graph import AcyclicDiGraph, DiGraph
+
+
+def batch_edges(components, edges, size, seed=0):
+    rnd = random.Random(seed)
+
+    for i in range(edges):
+        v_from, v_to = sorted(rnd.sample(range(size), 2))
+        yield (
+            '{}.{}'.format(i % components, v_from),
+            '{}.{}'.format(i % components, v_to),
+        )
+
+
+def timed(f, *args):
+    started = time.perf_counter()
+    result = f(*args)
+
+    return result, time.perf_counter() - started
+
+
+def main(args):
+    graph = AcyclicDiGraph.from_edges(
+        (('{}.{}'.format(i % args.components, i), 'root')
+         for i in range(args.graph_edges)),
+        strict=False,
+    )
+    batch = DiGraph.from_edges(batch_edges(
+        args.components,
+        args.edges,
+        max(2, args.edges // args.components),
+    ))
+
+    serial = ComponentValidator(min_edges=float('inf'))
+    parallel = ComponentValidator(processes=args.processes, min_edges=0)
+
+    for name, validator in (('serial', serial), ('parallel', parallel)):
+        cyclic, seconds = timed(validator.has_cycle, graph.di_graph, batch)
+        assert not cyclic
+
+        print('{:<10} {:>8.3f} s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=64)
+    parser.add_argument('--edges', type=int, default=500000)
+    parser.add_argument('--graph-edges', type=int, default=100000)
+    parser.add_argument('--processes', type=int, default=None)
+
+    main(parser.parse_args())
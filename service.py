@@ -13,7 +13,7 @@ if __name__ == '__main__':
         handlers=[logging.StreamHandler(sys.stdout)],
     )
 
-    config_path = os.path.join(
+    config_path = os.environ.get('SERVICE_CONFIG') or os.path.join(
         'config',
         'services',
         service_name,
@@ -24,4 +24,7 @@ if __name__ == '__main__':
 
     service = getattr(Services, service_name)()
 
-    service.run()
+    if args:
+        service.run_command(*args)
+    else:
+        service.run()
@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+
+from app.lib.admission import Admission, Gate, Overloaded
+
+
+class TestGate(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_limit(self):
+        gate = Gate(limit=1, queue=0)
+
+        async def run():
+            await gate.acquire()
+
+            with self.assertRaises(Overloaded):
+                await gate.acquire()
+
+            gate.release()
+            await gate.acquire()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual((2, 1), (gate.admitted, gate.rejected))
+
+    def test_cheapest_first(self):
+        gate = Gate(limit=1, queue=2)
+        order = []
+
+        async def request(name, cost):
+            await gate.acquire(cost)
+            order.append(name)
+            await asyncio.sleep(0)
+            gate.release()
+
+        async def run():
+            await gate.acquire()
+
+            waiting = [
+                asyncio.ensure_future(request('expensive', 100)),
+                asyncio.ensure_future(request('cheap', 1)),
+            ]
+            await asyncio.sleep(0)
+
+            gate.release()
+            await asyncio.gather(*waiting)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(['cheap', 'expensive'], order)
+
+    def test_shed_expensive(self):
+        gate = Gate(limit=1, queue=1)
+
+        async def run():
+            await gate.acquire()
+
+            expensive = asyncio.ensure_future(gate.acquire(100))
+            await asyncio.sleep(0)
+            cheap = asyncio.ensure_future(gate.acquire(1))
+            await asyncio.sleep(0)
+
+            with self.assertRaises(Overloaded):
+                await expensive
+
+            # a newcomer no cheaper than the queue is rejected
+            with self.assertRaises(Overloaded):
+                await gate.acquire(1)
+
+            gate.release()
+            await cheap
+
+        self.loop.run_until_complete(run())
+        self.assertEqual((1, 1), (gate.shed, gate.rejected))
+
+    def test_timeout_and_cancel(self):
+        gate = Gate(limit=1, queue=2, timeout=0.01)
+
+        async def run():
+            await gate.acquire()
+
+            with self.assertRaises(Overloaded):
+                await gate.acquire()
+
+            waiter = asyncio.ensure_future(gate.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+
+            self.assertEqual(0, len(gate))
+
+            gate.release()
+            self.assertEqual(0, gate.active)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(1, gate.timeouts)
+
+
+class TestAdmission(unittest.TestCase):
+
+    def test_from_config(self):
+        admission = Admission.from_config({
+            'admission': {
+                'default': {'limit': 8},
+                'routes': {'post_nodes': {'limit': 2, 'status': 429}},
+            },
+        })
+
+        self.assertEqual(2, admission.gate('post_nodes').limit)
+        self.assertEqual(429, admission.gate('post_nodes').status)
+        self.assertEqual(8, admission.gate('get_metrics').limit)
+        self.assertIs(
+            admission.gate('get_metrics'),
+            admission.gate('get_metrics'),
+        )
+
+        self.assertIsNone(Admission.from_config({}).gate('post_nodes'))
@@ -0,0 +1,97 @@
+import unittest
+
+from app.lib.cache import ConeCache, LRUCache
+
+
+class TestConeCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = ConeCache(maxsize=2)
+
+        cache.put(1, 'a', cone={0})
+        cache.put(2, 'b', cone={0})
+        self.assertEqual('a', cache.get(1))
+
+        cache.put(3, 'c', cone={0})
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual('a', cache.get(1))
+        self.assertEqual('c', cache.get(3))
+        self.assertEqual(
+            (3, 1, 1),
+            (cache.hits, cache.misses, cache.evictions),
+        )
+
+    def test_maxweight(self):
+        cache = ConeCache(maxsize=10, maxweight=5)
+
+        cache.put(1, 'a', cone=(), weight=3)
+        cache.put(2, 'b', cone=(), weight=3)
+        cache.put(3, 'c', cone=(), weight=6)
+
+        self.assertNotIn(1, cache)
+        self.assertIn(2, cache)
+        self.assertNotIn(3, cache)
+
+    def test_invalidate(self):
+        cache = ConeCache()
+
+        cache.put(1, 'a', cone={0, 2})
+        cache.put(3, 'b', cone={4})
+        cache.put(5, 'c', cone={1})
+
+        cache.invalidate(2, 6)
+
+        self.assertNotIn(1, cache)
+        self.assertIn(3, cache)
+        self.assertIn(5, cache)
+
+        cache.invalidate(5)
+
+        self.assertNotIn(5, cache)
+        self.assertEqual(2, cache.invalidations)
+
+    def test_stale_generation(self):
+        cache = ConeCache()
+
+        generation = cache.generation
+        cache.invalidate(0)
+        cache.put(1, 'a', cone={0}, generation=generation)
+
+        self.assertNotIn(1, cache)
+
+    def test_from_config(self):
+        cache = ConeCache.from_config(
+            {'mem': {'trees_cache': {'maxsize': 3}}},
+            'mem',
+        )
+        self.assertEqual(3, cache.maxsize)
+
+        cache = ConeCache.from_config({}, 'postgres')
+        self.assertEqual(1024, cache.maxsize)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = LRUCache(maxsize=2)
+
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        self.assertEqual('a', cache.get(1))
+
+        cache.put(3, 'c')
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual('a', cache.peek(1))
+        self.assertEqual(
+            (1, 1, 1),
+            (cache.hits, cache.misses, cache.evictions),
+        )
+
+    def test_disabled(self):
+        cache = LRUCache(maxsize=0)
+
+        cache.put(1, 'a')
+
+        self.assertNotIn(1, cache)
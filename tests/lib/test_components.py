@@ -0,0 +1,94 @@
+import unittest
+
+from app.lib.components import (
+    ComponentValidator,
+    DisjointSet,
+    weak_components,
+)
+from app.lib.graph import AcyclicDiGraph, DiGraph, InconsistentState
+
+
+class TestDisjointSet(unittest.TestCase):
+
+    def test_groups(self):
+        components = DisjointSet()
+
+        components.union(1, 2)
+        components.union(3, 4)
+        components.union(2, 4)
+        components.find(5)
+
+        self.assertEqual(components.find(1), components.find(3))
+        self.assertNotEqual(components.find(1), components.find(5))
+        self.assertCountEqual(
+            [{1, 2, 3, 4}, {5}],
+            components.groups(),
+        )
+
+    def test_weak_components(self):
+        graph = DiGraph.from_edges([
+            ('a', 'b'), ('c', 'b'), ('d', 'e'), ('f', None),
+        ])
+
+        self.assertCountEqual(
+            [{'a', 'b', 'c'}, {'d', 'e'}],
+            weak_components(graph),
+        )
+
+
+class TestComponentValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = ComponentValidator(processes=2, min_edges=0)
+
+    def test_acyclic(self):
+        graph = AcyclicDiGraph.from_edges([('a', 'b'), ('c', 'd')])
+        batch = DiGraph.from_edges([('b', 'c'), ('x', 'y'), ('y', 'z')])
+
+        graph.union_update(batch, validator=self.validator)
+
+        self.assertTrue(graph.has_edge('b', 'c'))
+        self.assertEqual(
+            {'parallel': 1, 'serial': 0, 'fallbacks': 0},
+            self.validator.stats(),
+        )
+
+    def test_cycle_in_component(self):
+        graph = AcyclicDiGraph.from_edges([('a', 'b')])
+        batch = DiGraph.from_edges([('b', 'c'), ('c', 'a'), ('x', 'y')])
+
+        with self.assertRaises(InconsistentState):
+            graph.union_update(batch, validator=self.validator)
+
+        self.assertFalse(graph.has_edge('b', 'c'))
+
+    def test_cycle_across_components(self):
+        # a -> b and c -> d are apart in the batch, b -> c and d -> a
+        # close the cycle in the existing graph
+        graph = AcyclicDiGraph.from_edges([('b', 'c'), ('d', 'a')])
+        batch = DiGraph.from_edges([('a', 'b'), ('c', 'd')])
+
+        with self.assertRaises(InconsistentState):
+            graph.union_update(batch, validator=self.validator)
+
+        self.assertEqual(1, self.validator.fallbacks)
+
+    def test_serial(self):
+        validator = ComponentValidator(min_edges=10)
+        graph = AcyclicDiGraph.from_edges([('a', 'b')])
+
+        self.assertTrue(validator.has_cycle(
+            graph.di_graph,
+            DiGraph.from_edges([('b', 'a'), ('x', 'y')]),
+        ))
+        self.assertEqual(1, validator.serial)
+
+    def test_from_config(self):
+        validator = ComponentValidator.from_config(
+            {'mem': {'parallel_validation': {'processes': 4}}},
+            'mem',
+        )
+
+        self.assertEqual(4, validator.processes)
+        self.assertEqual(100000, validator.min_edges)
+        self.assertIsNone(ComponentValidator.from_config({}, 'mem'))
@@ -1,3 +1,4 @@
+import copy
 import unittest
 
 from app.lib.graph import AcyclicDiGraph, DiGraph, InconsistentState
@@ -107,6 +108,114 @@ class TestDiGraph(unittest.TestCase):
                 inv_graph.vertexes_to(edge),
             )
 
+    def test_reverse_view(self):
+        graph = DiGraph({0: {1, 2}})
+        inv_graph = graph.reverse()
+
+        graph.insert(1, 2)
+        inv_graph.insert(3, 0)
+
+        self.assertEqual({0, 1}, inv_graph.vertexes_to(2))
+        self.assertEqual({0, 1}, graph.vertexes_from(2))
+        self.assertEqual({1, 2, 3}, graph.vertexes_to(0))
+        self.assertEqual({0}, inv_graph.vertexes_to(3))
+        self.assertEqual({0, 1, 2, 3}, inv_graph.vertexes())
+        self.assertIs(graph.edges, inv_graph.reverse().edges)
+
+    def test_copy(self):
+        graph = DiGraph({0: {1}})
+        graph_copy = copy.copy(graph)
+
+        graph_copy.insert(0, 2)
+        graph_copy.insert(3, 1)
+
+        self.assertEqual({1}, graph.vertexes_to(0))
+        self.assertEqual({0}, graph.vertexes_from(1))
+        self.assertEqual({0, 1}, graph.vertexes())
+        self.assertEqual({0, 3}, graph_copy.vertexes_from(1))
+
+    def test_len_merge(self):
+        a = DiGraph.from_edges([(0, 1), (0, 2), (0, 3)])
+        b = DiGraph.from_edges([(4, 5), (5, 6)])
+
+        self.assertEqual(4, len(a))
+        self.assertEqual(3, len(b))
+        self.assertEqual(0, len(DiGraph()))
+
+        merged = DiGraph.merge(b, a)
+
+        self.assertIsNot(a, merged)
+        self.assertEqual(set(range(7)), merged.vertexes())
+        self.assertEqual({5}, merged.vertexes_from(6))
+        self.assertEqual({0, 1, 2, 3}, a.vertexes())
+        self.assertEqual({4, 5, 6}, b.vertexes())
+
+    def test_from_edges(self):
+        graph = DiGraph.from_edges([(0, 1), (0, 2), (1, 2), (3, None)])
+
+        self.assertEqual({0, 1, 2, 3}, graph.vertexes())
+        self.assertEqual({1, 2}, graph.vertexes_to(0))
+        self.assertEqual({0, 1}, graph.vertexes_from(2))
+        self.assertEqual(DiGraph._sentinel, graph.vertexes_to(3))
+
+        graph_copy = DiGraph.from_edges(graph.iter_edges())
+
+        self.assertEqual(graph.edges, graph_copy.edges)
+        self.assertEqual(graph.inv_edges, graph_copy.inv_edges)
+        self.assertEqual(graph.vertexes(), graph_copy.vertexes())
+
+    def test_remove(self):
+        graph = DiGraph.from_edges([(0, 1), (0, 2), (1, 2)])
+        inv_graph = graph.reverse()
+
+        self.assertTrue(graph.remove(0, 2))
+        self.assertFalse(graph.remove(0, 2))
+        self.assertFalse(graph.remove(2, 0))
+
+        self.assertEqual({1}, graph.vertexes_to(0))
+        self.assertEqual({1}, inv_graph.vertexes_to(2))
+        self.assertTrue(graph.remove(1, 2))
+        self.assertEqual({0, 1, 2}, graph.vertexes())
+        self.assertEqual(
+            {(0, 1), (2, None)},
+            set(graph.iter_edges()),
+        )
+
+    def test_remove_vertex(self):
+        graph = AcyclicDiGraph.from_edges([(0, 1), (1, 2), (3, 1), (4, None)])
+
+        self.assertTrue(graph.remove_vertex(1))
+        self.assertFalse(graph.remove_vertex(1))
+
+        self.assertEqual({0, 2, 3, 4}, graph.vertexes())
+        self.assertFalse(graph.has_edge(0, 1))
+        self.assertEqual(DiGraph._sentinel, graph.vertexes_from(2))
+        self.assertEqual(
+            {(0, None), (2, None), (3, None), (4, None)},
+            set(graph.iter_edges()),
+        )
+
+        graph.insert(2, 0)
+        self.assertEqual({0}, graph.vertexes_to(2))
+
+    def test_from_edges_acycle(self):
+        with self.assertRaises(InconsistentState):
+            AcyclicDiGraph.from_edges([(0, 1), (1, 2), (2, 0)])
+
+        size = 10000
+        graph = AcyclicDiGraph.from_edges(
+            (i, i + 1) for i in range(size)
+        )
+
+        with self.assertRaises(InconsistentState):
+            graph.insert(size, 0)
+
+        with self.assertRaises(InconsistentState):
+            graph.union_update(DiGraph({size: {size + 1}, size + 1: {0}}))
+
+        graph.union_update(DiGraph({0: {size + 1}}))
+        self.assertEqual({1, size + 1}, graph.vertexes_to(0))
+
     def union_data_provider(self):
         return [
             (
@@ -144,6 +253,9 @@ class TestDiGraph(unittest.TestCase):
         for edge, vertices in vertices.items():
             self.assertEquals(a.vertexes_to(edge), vertices)
 
+            for vertex in vertices:
+                self.assertIn(edge, a.vertexes_from(vertex))
+
     @data_provider(union_data_provider)
     def test_union_acycle(self, a: DiGraph, b: DiGraph, vertices, exception):
         a = AcyclicDiGraph(a)
@@ -0,0 +1,64 @@
+import sys
+import unittest
+
+import numpy as np
+
+from app.lib.graph import DiGraph
+from app.lib.memory import HeapTracer, degree_histogram, graph_memory, sizeof
+
+
+class TestSizeof(unittest.TestCase):
+
+    def test_containers(self):
+        item = 'x' * 100
+        obj = {'a': [item, item]}
+
+        self.assertEqual(
+            sum(map(sys.getsizeof, (obj, 'a', obj['a'], item))),
+            sizeof(obj),
+        )
+        self.assertEqual(
+            sizeof(obj) - sys.getsizeof(item),
+            sizeof(obj, exclude={id(item)}),
+        )
+
+    def test_arrays(self):
+        array = np.zeros(1000, dtype=np.int64)
+
+        self.assertGreaterEqual(sizeof(array), 8000)
+        self.assertGreaterEqual(sizeof(array[10:]), 7920)
+
+    def test_degree_histogram(self):
+        self.assertEqual(
+            {'0': 1, '1': 2, '2-3': 2, '8-15': 1},
+            degree_histogram([0, 1, 1, 2, 3, 9]),
+        )
+
+    def test_graph_memory(self):
+        report = graph_memory(DiGraph.from_edges([('a', 'b'), ('c', None)]))
+
+        self.assertEqual((3, 1), (report['vertexes'], report['edges']))
+        self.assertEqual(
+            sum(map(sys.getsizeof, 'abc')),
+            report['bytes']['vertex_objects'],
+        )
+
+
+class TestHeapTracer(unittest.TestCase):
+
+    def test_diff(self):
+        heap = HeapTracer()
+
+        try:
+            self.assertEqual([], heap.diff())
+
+            garbage = [object() for _ in range(10000)]
+            diff = heap.diff()
+
+            self.assertTrue(heap.stats()['tracing'])
+            self.assertTrue(any(stat['size_diff'] > 0 for stat in diff))
+            del garbage
+        finally:
+            heap.stop()
+
+        self.assertFalse(heap.stats()['tracing'])
@@ -0,0 +1,31 @@
+import unittest
+
+from app.lib.metrics import Timings
+
+
+class TestTimings(unittest.TestCase):
+
+    def test_record(self):
+        timings = Timings()
+
+        timings.record('a', 0.001)
+        timings.record('a', 0.003)
+        with timings.time('b'):
+            pass
+
+        stats = timings.stats()
+
+        self.assertEqual(
+            {'count': 2, 'total_ms': 4.0, 'avg_ms': 2.0, 'max_ms': 3.0},
+            stats['a'],
+        )
+        self.assertEqual(1, stats['b']['count'])
+
+    def test_exception(self):
+        timings = Timings()
+
+        with self.assertRaises(KeyError):
+            with timings.time('a'):
+                raise KeyError()
+
+        self.assertEqual(1, timings.stats()['a']['count'])
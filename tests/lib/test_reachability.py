@@ -0,0 +1,55 @@
+import random
+import unittest
+
+from app.lib.graph import AcyclicDiGraph, DiGraph
+from app.lib.reachability import ReachabilityIndex
+
+
+class TestReachabilityIndex(unittest.TestCase):
+
+    def test_reaches(self):
+        graph = AcyclicDiGraph(
+            DiGraph({0: {1, 2}, 1: {3}, 2: {3}, 3: {4}, 5: {4}, 6: set()})
+        )
+        index = ReachabilityIndex.from_graph(graph)
+
+        pairs = [
+            (0, 4), (0, 3), (1, 2), (4, 0), (5, 4),
+            (5, 3), (6, 6), (6, 0), (0, 7), (7, 7),
+        ]
+        self.assertEqual(
+            [True, True, False, False, True,
+             False, True, False, False, False],
+            list(index.reaches(pairs)),
+        )
+
+    def test_blocks(self):
+        rnd = random.Random(0)
+        size = 300
+
+        graph = AcyclicDiGraph.from_edges(
+            sorted(rnd.sample(range(size), 2)) for _ in range(600)
+        )
+
+        def descendants(vertex):
+            seen, stack = {vertex}, [vertex]
+            while stack:
+                for v_to in graph.vertexes_to(stack.pop()):
+                    if v_to not in seen:
+                        seen.add(v_to)
+                        stack.append(v_to)
+            return seen
+
+        # force a single 64-bit word per block
+        index = ReachabilityIndex.from_graph(graph, max_bytes=8 * size)
+        self.assertEqual(64, index.block_size)
+
+        vertexes = list(graph.vertexes())
+        pairs = [
+            (rnd.choice(vertexes), rnd.choice(vertexes)) for _ in range(5000)
+        ]
+
+        self.assertEqual(
+            [v_to in descendants(v_from) for v_from, v_to in pairs],
+            list(index.reaches(pairs)),
+        )
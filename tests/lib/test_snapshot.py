@@ -0,0 +1,21 @@
+import io
+import unittest
+
+from app.lib import snapshot
+from app.lib.graph import DiGraph
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_round_trip(self):
+        graph = DiGraph.from_edges([(0, 1), (0, 2), ('a', None)])
+
+        f = io.StringIO()
+        snapshot.dump(graph, f)
+        f.seek(0)
+
+        restored = DiGraph.from_edges(snapshot.load(f))
+
+        self.assertEqual({0, 1, 2, 'a'}, restored.vertexes())
+        self.assertEqual({1, 2}, restored.vertexes_to(0))
+        self.assertEqual(set(), restored.vertexes_to('a'))
@@ -0,0 +1,71 @@
+import io
+import unittest
+
+from app.lib import snapshot, subgraph
+from app.lib.graph import DiGraph
+
+
+class TestSubgraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = DiGraph.from_edges(
+            [('a', 'b'), ('b', 'c'), ('a', 'c'), ('c', 'd'), ('x', None)]
+        )
+
+    def test_within(self):
+        down = self.graph.vertexes_to
+
+        self.assertEqual({'a'}, subgraph.within(down, 'a', 0))
+        self.assertEqual({'a', 'b', 'c'}, subgraph.within(down, 'a', 1))
+        self.assertEqual({'a', 'b', 'c', 'd'}, subgraph.within(down, 'a'))
+        self.assertEqual(
+            {'d', 'c', 'b', 'a'},
+            subgraph.within(self.graph.vertexes_from, 'd'),
+        )
+
+    def test_induced(self):
+        induced = subgraph.induced(self.graph.vertexes_to, {'a', 'c', 'x'})
+
+        self.assertEqual({'a', 'c', 'x'}, induced.vertexes())
+        self.assertEqual({'c'}, induced.vertexes_to('a'))
+        self.assertEqual(set(), induced.vertexes_to('x'))
+
+    def test_ndjson(self):
+        data = b''.join(subgraph.ndjson(self.graph, batch=2)).decode()
+
+        restored = DiGraph.from_edges(snapshot.load(io.StringIO(data)))
+
+        self.assertEqual(self.graph.vertexes(), restored.vertexes())
+        self.assertEqual({'b', 'c'}, restored.vertexes_to('a'))
+        self.assertEqual(set(), restored.vertexes_to('x'))
+
+    def test_csr(self):
+        data = b''.join(subgraph.csr(self.graph, batch=2))
+
+        vertexes, offsets, targets = subgraph.load_csr(data)
+
+        self.assertEqual(set(vertexes), set(self.graph.vertexes()))
+        self.assertEqual(len(vertexes) + 1, len(offsets))
+        self.assertEqual(4, len(targets))
+
+        edges = {
+            (vertexes[i], vertexes[j])
+            for i in range(len(vertexes))
+            for j in targets[offsets[i]:offsets[i + 1]]
+        }
+        self.assertEqual(
+            {('a', 'b'), ('b', 'c'), ('a', 'c'), ('c', 'd')},
+            edges,
+        )
+        # ids are topological
+        self.assertTrue(
+            all(
+                i < j
+                for i in range(len(vertexes))
+                for j in targets[offsets[i]:offsets[i + 1]]
+            )
+        )
+
+    def test_csr_magic(self):
+        with self.assertRaises(ValueError):
+            subgraph.load_csr(b'NOPE' + bytes(12))
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from app.lib.graph import AcyclicDiGraph, DiGraph
+from app.lib.topo import TopologicalLayers
+
+
+class TestTopologicalLayers(unittest.TestCase):
+
+    def assertLayered(self, graph, layers):
+        expected = TopologicalLayers(graph).depths
+
+        self.assertEqual(expected, layers.depths)
+        self.assertEqual(set(graph.vertexes()), set(layers))
+
+        for v_from, v_to in graph.iter_edges():
+            if v_to is not None:
+                self.assertLess(layers.depth(v_from), layers.depth(v_to))
+
+    def test_rebuild(self):
+        graph = DiGraph({0: {1, 2}, 1: {3}, 2: {3}, 3: {4}, 5: {4}})
+        layers = TopologicalLayers(graph)
+
+        self.assertEqual(
+            {0: 0, 1: 1, 2: 1, 3: 2, 4: 3, 5: 0},
+            layers.depths,
+        )
+        self.assertEqual([5, 4], layers.order([4, 5]))
+
+    def test_insert(self):
+        graph = AcyclicDiGraph()
+        layers = TopologicalLayers(graph)
+
+        for v_from, v_to in [(0, 1), (1, 2), (3, None), (3, 0), (4, 2)]:
+            graph.insert(v_from, v_to)
+            layers.insert(v_from, v_to)
+
+            self.assertLayered(graph, layers)
+
+        self.assertEqual({3: 0, 4: 0, 0: 1, 1: 2, 2: 3}, layers.depths)
+
+    def test_update(self):
+        rnd = random.Random(0)
+        graph = AcyclicDiGraph()
+        layers = TopologicalLayers(graph)
+
+        for _ in range(20):
+            tmp = DiGraph.from_edges(
+                sorted(rnd.sample(range(50), 2)) for _ in range(10)
+            )
+
+            graph.union_update(tmp)
+            layers.update(
+                tmp.vertexes(),
+                [v for v in tmp.vertexes() if tmp.vertexes_to(v)],
+            )
+
+            self.assertLayered(graph, layers)
+
+    def test_remove(self):
+        rnd = random.Random(0)
+        graph = AcyclicDiGraph.from_edges(
+            sorted(rnd.sample(range(50), 2)) for _ in range(200)
+        )
+        layers = TopologicalLayers(graph)
+
+        for _ in range(20):
+            edges = rnd.sample(
+                [e for e in graph.iter_edges() if e[1] is not None],
+                5,
+            )
+            for edge in edges:
+                graph.remove(*edge)
+            layers.remove((), [v_to for _, v_to in edges])
+
+            self.assertLayered(graph, layers)
+
+        for vertex in rnd.sample(sorted(graph.vertexes()), 10):
+            children = set(graph.vertexes_to(vertex))
+            graph.remove_vertex(vertex)
+            layers.remove([vertex], children)
+
+            self.assertLayered(graph, layers)
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+
+from app.lib.graph import DiGraph
+from app.lib.traversal import MemoizedTraversal
+
+from ..utils import data_provider
+
+
+class TestMemoizedTraversal(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+        self.graph = DiGraph({0: {1, 2}, 1: {3}, 2: {3}, 3: {4}})
+        self.inv_graph = self.graph.reverse()
+        self.calls = []
+
+        async def _descendants(v):
+            self.calls.append(v)
+            return self.graph.vertexes_to(v)
+
+        async def _ancestors(v):
+            return self.inv_graph.vertexes_to(v)
+
+        self.traversal = MemoizedTraversal(_descendants, _ancestors)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_data_provider(self):
+        return [
+            ('trees', 3, [[0, 1, 3, 4], [0, 2, 3, 4]]),
+            ('trees', 0, [[0, 1, 3, 4], [0, 2, 3, 4]]),
+            ('count', 3, 2),
+            ('count', 4, 2),
+            ('ancestors', 3, [0, 1, 2]),
+            ('descendants', 1, [3, 4]),
+            ('descendants', 4, []),
+        ]
+
+    @data_provider(run_data_provider)
+    def test_run(self, operation, vertex, expected):
+        result = self.loop.run_until_complete(
+            self.traversal.run(operation, vertex)
+        )
+
+        if isinstance(expected, list):
+            self.assertEqual(sorted(expected), sorted(result))
+        else:
+            self.assertEqual(expected, result)
+
+    def test_memoization(self):
+        for vertex in (0, 1, 2, 3):
+            self.loop.run_until_complete(self.traversal.trees(vertex))
+            self.loop.run_until_complete(self.traversal.descendants(vertex))
+
+        self.assertEqual(sorted(self.calls), sorted(set(self.calls)))
+
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self.traversal.run('drop', 0))
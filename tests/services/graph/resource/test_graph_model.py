@@ -1,8 +1,11 @@
 import asyncio
+import os
+import tempfile
 import unittest
 
+from app.lib import snapshot
 from app.lib.graph import AcyclicDiGraph, DiGraph, InconsistentState
-from app.services.graph.resource import mem, pg
+from app.services.graph.resource import cached, mem, pg, sqlite
 
 
 class BaseGraphModelMix:
@@ -73,6 +76,326 @@ class BaseGraphModelMix:
                 tuple(map(int, subtree)) in expected_subtrees
             )
 
+    def test_query(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 0, 'node_id': 2},
+                    {'parent': 1, 'node_id': 3},
+                    {'parent': 2, 'node_id': 3},
+                    {'parent': 3, 'node_id': 4},
+                ]
+            )
+        )
+
+        async def query(vertexes, operation):
+            return [
+                (vertex, result)
+                async for vertex, result in graph_model.query(
+                    list(map(self.cast, vertexes)),
+                    operation,
+                )
+            ]
+
+        results = self.loop.run_until_complete(
+            query([3, 1, 5], 'count')
+        )
+        self.assertEqual(
+            [(self.cast(3), 2), (self.cast(1), 1), (self.cast(5), None)],
+            results,
+        )
+
+        results = self.loop.run_until_complete(
+            query([4, 3], 'ancestors')
+        )
+        self.assertEqual(
+            [{0, 1, 2, 3}, {0, 1, 2}],
+            [set(map(int, result)) for _, result in results],
+        )
+
+        results = self.loop.run_until_complete(
+            query([0], 'descendants')
+        )
+        self.assertEqual({1, 2, 3, 4}, set(map(int, results[0][1])))
+
+        results = self.loop.run_until_complete(
+            query([1], 'trees')
+        )
+        self.assertEqual(
+            [(0, 1, 3, 4)],
+            [tuple(map(int, tree)) for tree in results[0][1]],
+        )
+
+    def test_trees_cache(self):
+        graph_model = self.graph_model
+
+        def insert(*edges):
+            self.loop.run_until_complete(
+                graph_model.insert(
+                    [{'parent': f, 'node_id': t} for f, t in edges]
+                )
+            )
+
+        def trees(vertex):
+            return sorted(
+                tuple(map(int, tree))
+                for tree in self.loop.run_until_complete(
+                    graph_model.trees(self.cast(vertex))
+                )
+            )
+
+        insert((0, 1), (1, 2), (5, 6))
+
+        self.assertEqual([(0, 1, 2)], trees(1))
+        self.assertEqual([(5, 6)], trees(6))
+        self.assertEqual([(0, 1, 2)], trees(1))
+        self.assertEqual(1, graph_model.trees_cache.hits)
+
+        insert((2, 3))
+
+        self.assertEqual([(0, 1, 2, 3)], trees(1))
+        self.assertEqual([(5, 6)], trees(6))
+        self.assertEqual(2, graph_model.trees_cache.hits)
+
+    def test_topo(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 1, 'node_id': 2},
+                    {'parent': 5, 'node_id': 6},
+                ]
+            )
+        )
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': 6, 'node_id': 0}])
+        )
+
+        async def topo(*args):
+            return [
+                (int(vertex), depth)
+                async for vertex, depth in graph_model.topo(*args)
+            ]
+
+        self.assertEqual(
+            [(5, 0), (6, 1), (0, 2), (1, 3), (2, 4)],
+            self.loop.run_until_complete(topo()),
+        )
+        self.assertEqual(
+            [(0, 2), (1, 3), (2, 4)],
+            self.loop.run_until_complete(topo(self.cast(0), 'down')),
+        )
+        self.assertEqual(
+            [(5, 0), (6, 1), (0, 2), (1, 3)],
+            self.loop.run_until_complete(topo(self.cast(1), 'up')),
+        )
+        self.assertEqual(
+            3,
+            self.loop.run_until_complete(graph_model.depth(self.cast(1))),
+        )
+        self.assertIsNone(
+            self.loop.run_until_complete(graph_model.depth(self.cast(7))),
+        )
+
+    def test_warm(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': 0, 'node_id': 1}])
+        )
+        self.loop.run_until_complete(graph_model.warm())
+
+        self.assertEqual(
+            [True],
+            self.loop.run_until_complete(
+                graph_model.reachability([(self.cast(0), self.cast(1))])
+            ),
+        )
+
+    def test_delete(self):
+        graph_model = self.graph_model
+        run = self.loop.run_until_complete
+
+        def trees(vertex):
+            return sorted(
+                list(map(int, tree))
+                for tree in run(graph_model.trees(self.cast(vertex)))
+            )
+
+        run(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 1, 'node_id': 2},
+                    {'parent': 2, 'node_id': 3},
+                    {'parent': 0, 'node_id': 3},
+                    {'parent': 3, 'node_id': 4},
+                ]
+            )
+        )
+        self.assertEqual([[0, 1, 2, 3, 4], [0, 3, 4]], trees(3))
+        version = run(graph_model.version())
+
+        self.assertEqual(
+            version + 1,
+            run(
+                graph_model.delete(
+                    [
+                        {'parent': 1, 'node_id': 2},
+                        {'parent': 4, 'node_id': 0},
+                    ]
+                )
+            ),
+        )
+
+        self.assertEqual([[0, 3, 4], [2, 3, 4]], trees(3))
+        self.assertEqual(0, run(graph_model.depth(self.cast(2))))
+        self.assertEqual(2, run(graph_model.depth(self.cast(4))))
+        self.assertTrue(run(graph_model.has_vertex(self.cast(2))))
+        self.assertEqual(
+            [False, True],
+            run(
+                graph_model.reachability(
+                    [
+                        (self.cast(1), self.cast(3)),
+                        (self.cast(2), self.cast(4)),
+                    ]
+                )
+            ),
+        )
+
+    def test_delete_vertex(self):
+        graph_model = self.graph_model
+        run = self.loop.run_until_complete
+
+        run(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 1, 'node_id': 2},
+                    {'parent': 0, 'node_id': 2},
+                    {'parent': 2, 'node_id': 3},
+                ]
+            )
+        )
+        self.assertEqual(3, run(graph_model.depth(self.cast(3))))
+        run(graph_model.trees(self.cast(0)))
+
+        run(graph_model.delete_vertex(self.cast(1)))
+
+        self.assertFalse(run(graph_model.has_vertex(self.cast(1))))
+        self.assertIsNone(run(graph_model.depth(self.cast(1))))
+        self.assertEqual(2, run(graph_model.depth(self.cast(3))))
+        self.assertEqual(
+            [[0, 2, 3]],
+            [
+                list(map(int, tree))
+                for tree in run(graph_model.trees(self.cast(0)))
+            ],
+        )
+
+        run(graph_model.delete_vertex(self.cast(2)))
+
+        self.assertEqual(0, run(graph_model.depth(self.cast(3))))
+        self.assertEqual(
+            [False],
+            run(
+                graph_model.reachability([(self.cast(0), self.cast(3))])
+            ),
+        )
+
+        # the edges are gone both ways
+        run(graph_model.insert([{'parent': 3, 'node_id': 0}]))
+
+    def test_subgraph(self):
+        graph_model = self.graph_model
+        run = self.loop.run_until_complete
+
+        run(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 1, 'node_id': 2},
+                    {'parent': 0, 'node_id': 2},
+                    {'parent': 2, 'node_id': 3},
+                    {'parent': 3, 'node_id': 4},
+                    {'parent': 5, 'node_id': 1},
+                    {'node_id': 6},
+                ]
+            )
+        )
+
+        def edges(vertex, up=None, down=None):
+            subgraph = run(graph_model.subgraph(self.cast(vertex), up, down))
+
+            return {
+                (int(v_from), None if v_to is None else int(v_to))
+                for v_from, v_to in subgraph.iter_edges()
+            }
+
+        self.assertEqual(
+            {(0, 1), (1, 2), (0, 2), (2, 3), (3, 4), (5, 1)},
+            edges(2),
+        )
+        # 0 -> 2 joins two vertexes of the cone without passing through 1
+        self.assertEqual({(0, 1), (5, 1), (1, 2), (0, 2)}, edges(1, 1, 1))
+        self.assertEqual({(0, 1), (1, 2), (0, 2), (2, 3)}, edges(2, 1, 1))
+        self.assertEqual({(2, 3), (3, 4)}, edges(4, 2, 0))
+        self.assertEqual({(3, None)}, edges(3, 0, 0))
+        self.assertEqual({(6, None)}, edges(6))
+        self.assertIsNone(run(graph_model.subgraph(self.cast(9))))
+
+    def test_memory(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': 0, 'node_id': 1}])
+        )
+        self.loop.run_until_complete(graph_model.trees(self.cast(0)))
+
+        report = self.loop.run_until_complete(graph_model.memory())
+
+        self.assertGreater(report['bytes']['trees_cache'], 0)
+        self.assertEqual(sum(report['bytes'].values()), report['total_bytes'])
+
+    def test_reachability(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': 0, 'node_id': 1},
+                    {'parent': 1, 'node_id': 2},
+                    {'parent': 3, 'node_id': 2},
+                ]
+            )
+        )
+
+        pairs = [(0, 2), (2, 0), (0, 3), (1, 1), (0, 9)]
+        self.assertEqual(
+            [True, False, False, True, False],
+            self.loop.run_until_complete(
+                graph_model.reachability(
+                    [tuple(map(self.cast, pair)) for pair in pairs]
+                )
+            ),
+        )
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': 2, 'node_id': 9}])
+        )
+        self.assertEqual(
+            [True],
+            self.loop.run_until_complete(
+                graph_model.reachability([(self.cast(0), self.cast(9))])
+            ),
+        )
+
 
 class TestInMemoryGraphModel(BaseGraphModelMix, unittest.TestCase):
 
@@ -86,9 +409,187 @@ class TestInMemoryGraphModel(BaseGraphModelMix, unittest.TestCase):
     def tearDown(self):
         super().tearDown()
 
+    def test_warm_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'graph.ndjson')
+            with open(path, 'w') as f:
+                snapshot.dump(DiGraph.from_edges([(0, 1), (1, 2)]), f)
+
+            graph_model = mem.InMemoryGraphModel(snapshot_path=path)
+            self.loop.run_until_complete(
+                graph_model.insert([{'parent': 2, 'node_id': 3}])
+            )
+            self.loop.run_until_complete(graph_model.warm())
+
+        self.assertEqual(
+            [[0, 1, 2, 3]],
+            self.loop.run_until_complete(graph_model.trees(1)),
+        )
+        self.assertEqual(
+            3,
+            self.loop.run_until_complete(graph_model.depth(3)),
+        )
+
+    def test_memory_graph(self):
+        self.loop.run_until_complete(
+            self.graph_model.insert([
+                {'parent': 0, 'node_id': 1},
+                {'parent': 0, 'node_id': 2},
+            ])
+        )
+
+        report = self.loop.run_until_complete(self.graph_model.memory())
+
+        self.assertEqual((3, 2), (report['vertexes'], report['edges']))
+        self.assertEqual({'0': 2, '2-3': 1}, report['out_degree'])
+        self.assertEqual({'0': 1, '1': 2}, report['in_degree'])
+        for name in ('edges', 'inv_edges', '_vtxs', 'layers'):
+            self.assertGreater(report['bytes'][name], 0)
+
+
+class TestSqliteGraphModel(BaseGraphModelMix, unittest.TestCase):
+    cast = str
+
+    def setUp(self):
+        super().setUp()
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = sqlite.SqliteEngine(
+            {'sqlite': {'path': os.path.join(self.tmp.name, 'graph.db')}},
+            self.loop,
+        )
+        self.loop.run_until_complete(self.engine.init_engine())
+        self.graph_model = sqlite.SqliteGraphModel(self.engine)
+        self.loop.run_until_complete(self.graph_model.init())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.engine.close())
+        self.tmp.cleanup()
+
+        super().tearDown()
+
+    def test_trees_foreign_writes(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': '0', 'node_id': '1'}])
+        )
+        self.assertEqual(
+            [['0', '1']],
+            self.loop.run_until_complete(graph_model.trees('1')),
+        )
+
+        # another process writing to the same database
+        other = sqlite.SqliteGraphModel(self.engine)
+        self.loop.run_until_complete(
+            other.insert([{'parent': '1', 'node_id': '2'}])
+        )
+
+        self.assertEqual(
+            [['0', '1', '2']],
+            self.loop.run_until_complete(graph_model.trees('1')),
+        )
+
+
+class TestCachedGraphModel(TestSqliteGraphModel):
+
+    def setUp(self):
+        super().setUp()
+
+        self.backend = self.graph_model
+        self.graph_model = cached.CachedGraphModel(self.backend)
+
+    def test_adjacency_cache(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': '0', 'node_id': '1'},
+                    {'parent': '1', 'node_id': '2'},
+                ]
+            )
+        )
+        self.loop.run_until_complete(graph_model.trees('1'))
+
+        down = graph_model.adjacency_cache['down']
+        self.assertEqual({'2'}, down.peek('1'))
+
+        # write-through, the cycle is found without the backend
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': '1', 'node_id': '3'}])
+        )
+        self.assertEqual({'2', '3'}, down.peek('1'))
+
+        misses = down.misses
+        with self.assertRaises(InconsistentState):
+            self.loop.run_until_complete(
+                graph_model.insert([{'parent': '2', 'node_id': '0'}])
+            )
+        self.assertEqual(misses, down.misses)
+        self.assertEqual(0, graph_model.resyncs)
+
+    def test_adjacency_cache_delete(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': '0', 'node_id': '1'},
+                    {'parent': '1', 'node_id': '2'},
+                    {'parent': '0', 'node_id': '2'},
+                ]
+            )
+        )
+        self.loop.run_until_complete(graph_model.trees('1'))
+        self.loop.run_until_complete(graph_model.trees('2'))
+
+        down = graph_model.adjacency_cache['down']
+        up = graph_model.adjacency_cache['up']
+
+        self.loop.run_until_complete(
+            graph_model.delete([{'parent': '0', 'node_id': '2'}])
+        )
+        self.assertEqual({'1'}, down.peek('0'))
+        self.assertEqual({'1'}, up.peek('2'))
+
+        self.loop.run_until_complete(graph_model.delete_vertex('1'))
+        self.assertEqual(set(), down.peek('0'))
+        self.assertEqual(set(), up.peek('2'))
+        self.assertIsNone(down.peek('1'))
+        self.assertEqual(0, graph_model.resyncs)
+
+    def test_foreign_writes(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': '0', 'node_id': '1'}])
+        )
+        self.assertEqual(
+            [['0', '1']],
+            self.loop.run_until_complete(graph_model.trees('1')),
+        )
+
+        # another process writing to the same database
+        self.loop.run_until_complete(
+            self.backend.insert([{'parent': '1', 'node_id': '2'}])
+        )
+
+        self.assertEqual(
+            [['0', '1', '2']],
+            self.loop.run_until_complete(graph_model.trees('1')),
+        )
+        self.assertEqual(1, graph_model.resyncs)
+
+        with self.assertRaises(InconsistentState):
+            self.loop.run_until_complete(
+                graph_model.insert([{'parent': '2', 'node_id': '0'}])
+            )
+
 
 class TestPgGinGraphModel(BaseGraphModelMix, unittest.TestCase):
     cast = str
+    model_cls = pg.PgGinGraphModel
 
     def setUp(self):
         super().setUp()
@@ -110,10 +611,97 @@ class TestPgGinGraphModel(BaseGraphModelMix, unittest.TestCase):
             self.loop,
         )
         self.loop.run_until_complete(self.engine.init_engine())
-        self.graph_model = pg.PgGinGraphModel(self.engine)
+        self.graph_model = self.model_cls(self.engine)
         self.loop.run_until_complete(self.graph_model.init())
 
     def tearDown(self):
         self.loop.run_until_complete(self.engine.close())
 
         super().tearDown()
+
+    def test_connection_scope(self):
+        async def acquire_twice():
+            async with self.engine.scope():
+                async with self.engine.acquire() as conn:
+                    async with self.engine.acquire() as other:
+                        return conn is other
+
+        self.assertTrue(self.loop.run_until_complete(acquire_twice()))
+
+    def test_migrate(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': '0', 'node_id': '1'},
+                    {'parent': '1', 'node_id': '2'},
+                    {'parent': '0', 'node_id': '2'},
+                    {'parent': '2', 'node_id': '3'},
+                ]
+            )
+        )
+
+        async def downgrade():
+            async with self.engine.engine().acquire() as conn:
+                await conn.execute('alter table graph drop column depth')
+                await conn.execute(
+                    "delete from graph where vertex_out = '{}'"
+                )
+
+        self.loop.run_until_complete(downgrade())
+        self.loop.run_until_complete(graph_model.migrate())
+
+        self.assertTrue(
+            self.loop.run_until_complete(graph_model.has_vertex('3'))
+        )
+        self.assertEqual(
+            3,
+            self.loop.run_until_complete(graph_model.depth('3')),
+        )
+
+    def test_metrics(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert([{'parent': '0', 'node_id': '1'}])
+        )
+        for _ in range(2):
+            self.loop.run_until_complete(graph_model.has_vertex('1'))
+
+        metrics = self.loop.run_until_complete(graph_model.metrics())
+
+        self.assertEqual(2, metrics['pg']['statements']['has_vertex']['count'])
+        self.assertGreater(metrics['pg']['acquire']['count'], 0)
+        self.assertEqual(5, metrics['pg']['pool']['maxsize'])
+
+
+class TestPgClosureGraphModel(TestPgGinGraphModel):
+    model_cls = pg.PgClosureGraphModel
+
+    def test_rebuild_closure(self):
+        graph_model = self.graph_model
+
+        self.loop.run_until_complete(
+            graph_model.insert(
+                [
+                    {'parent': '0', 'node_id': '1'},
+                    {'parent': '1', 'node_id': '2'},
+                    {'parent': '0', 'node_id': '2'},
+                ]
+            )
+        )
+
+        async def closure():
+            async with self.engine.engine().acquire() as conn:
+                rows = await conn.execute(
+                    'select ancestor, descendant, depth from graph_closure'
+                )
+                return {tuple(row) for row in await rows.fetchall()}
+
+        expected = self.loop.run_until_complete(closure())
+        self.assertIn(('0', '2', 1), expected)
+
+        self.loop.run_until_complete(graph_model.rebuild_closure())
+
+        self.assertEqual(expected, self.loop.run_until_complete(closure()))